@@ -1,14 +1,19 @@
 """Base agent class for all AgentHub agents."""
 
+import asyncio
 import logging
+from collections import OrderedDict
 from typing import Optional, Callable, Awaitable, List, Dict, Any
 
 import anthropic
 
-from config import ANTHROPIC_API_KEY, DEFAULT_MODEL, MAX_TOKENS
+from config import ANTHROPIC_API_KEY, DEFAULT_MODEL, MAX_TOKENS, MAX_TOOL_ROUNDS
 
 logger = logging.getLogger(__name__)
 
+# Conversations whose history an agent keeps; the least recently used is dropped
+MAX_HISTORY_CONVERSATIONS = 100
+
 
 class BaseAgent:
     """Base class for all specialized agents."""
@@ -22,16 +27,63 @@ class BaseAgent:
     temperature: float = 0.7
 
     def __init__(self) -> None:
-        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        self.conversation_history: List[Dict[str, str]] = []
-        self.status: str = "idle"
-        self.current_task: Optional[str] = None
+        self.client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+        # conversation_id -> completed user/assistant turns. Calls may run
+        # concurrently, so each builds its own messages from a snapshot and
+        # adds its turn only once it is answered.
+        self.conversation_history: "OrderedDict[Any, List[Dict[str, str]]]" = OrderedDict()
+        # Running chat() calls: call number -> task text
+        self._active_calls: Dict[int, str] = {}
+        self._call_counter = 0
         self._manager: Any = None
+        # Shared ToolExecutor (set by the manager) that runs this agent's tools
+        self._tool_executor: Any = None
+        self._status: str = "idle"
+        self._current_task: Optional[str] = None
+        # Runtime settings; the manager pushes updates from the settings store
+        self.model: str = DEFAULT_MODEL
+        self.max_tokens: int = MAX_TOKENS
 
     def set_manager(self, manager: Any) -> None:
         """Set reference to the orchestrator manager for delegation."""
         self._manager = manager
 
+    def set_tool_executor(self, executor: Any) -> None:
+        """Set the ToolExecutor used to run this agent's tools."""
+        self._tool_executor = executor
+
+    def apply_settings(self, values: Dict[str, Any]) -> None:
+        """Apply changed runtime settings; they take effect from the next chat."""
+        if "default_model" in values:
+            self.model = values["default_model"]
+        if "max_tokens" in values:
+            self.max_tokens = values["max_tokens"]
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str) -> None:
+        if value != self._status:
+            self._status = value
+            self._notify_state_change("status")
+
+    @property
+    def current_task(self) -> Optional[str]:
+        return self._current_task
+
+    @current_task.setter
+    def current_task(self, value: Optional[str]) -> None:
+        if value != self._current_task:
+            self._current_task = value
+            self._notify_state_change("current_task")
+
+    def _notify_state_change(self, field: str) -> None:
+        """Tell the manager a status field changed so it can version and publish it."""
+        if self._manager is not None:
+            self._manager.on_agent_state_change(self.name, field)
+
     def _build_system_prompt(self) -> str:
         """Build the full system prompt including persona and delegation instructions."""
         parts = [self.persona]
@@ -44,7 +96,8 @@ class BaseAgent:
                 "Only delegate when a task is clearly better suited to another agent's expertise. "
                 "Always explain your plan before delegating."
             )
-        if self.tools:
+        if self.tools and self._tool_executor is None:
+            # Without an executor the tools can only be described, not called
             tool_list = ", ".join(self.tools)
             parts.append(f"\n\nYou have access to these tools: {tool_list}")
         return "\n".join(parts)
@@ -53,38 +106,79 @@ class BaseAgent:
         self,
         message: str,
         on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+        conversation_id: Any = None,
     ) -> str:
         """Send a message and stream the response.
 
+        When the agent has tools, the model may call them: all tool calls of
+        one model turn run concurrently, their results are sent back, and
+        the model continues, for at most MAX_TOOL_ROUNDS rounds. Only the
+        final text is kept in the conversation history.
+
         Args:
             message: The user message to process.
             on_token: Optional async callback invoked for each streamed token.
+            conversation_id: Conversation whose earlier turns are sent as
+                context; concurrent calls for other conversations never see
+                each other's messages.
 
         Returns:
             The full response text.
         """
+        self._call_counter += 1
+        call = self._call_counter
+        self._active_calls[call] = message[:100]
         self.status = "thinking"
         self.current_task = message[:100]
 
-        self.conversation_history.append({"role": "user", "content": message})
+        history = list(self.conversation_history.get(conversation_id, []))
+        turn = {"role": "user", "content": message}
 
+        tools = self._tool_executor.schemas(self.tools) if self._tool_executor else []
         full_response = ""
         try:
-            with self.client.messages.stream(
-                model=DEFAULT_MODEL,
-                max_tokens=MAX_TOKENS,
-                temperature=self.temperature,
-                system=self._build_system_prompt(),
-                messages=self.conversation_history,
-            ) as stream:
-                for text in stream.text_stream:
-                    full_response += text
+            # Tool calls and results of this turn, sent after the history
+            exchange: List[Dict[str, Any]] = []
+            rounds = 0
+            while True:
+                request: Dict[str, Any] = {
+                    "model": self.model,
+                    "max_tokens": self.max_tokens,
+                    "temperature": self.temperature,
+                    "system": self._build_system_prompt(),
+                    "messages": history + [turn] + exchange,
+                }
+                if tools:
+                    request["tools"] = tools
+                if full_response and not full_response.endswith("\n"):
+                    # Keep text from separate rounds in separate paragraphs
+                    full_response += "\n\n"
                     if on_token:
-                        await on_token(text)
+                        await on_token("\n\n")
 
-            self.conversation_history.append(
-                {"role": "assistant", "content": full_response}
-            )
+                # Async client so streaming yields to the event loop and the
+                # stream is closed promptly if this coroutine is cancelled
+                async with self.client.messages.stream(**request) as stream:
+                    async for text in stream.text_stream:
+                        full_response += text
+                        if on_token:
+                            await on_token(text)
+                    reply = await stream.get_final_message()
+
+                calls = [block for block in reply.content if block.type == "tool_use"]
+                if reply.stop_reason != "tool_use" or not calls:
+                    break
+                if rounds >= MAX_TOOL_ROUNDS:
+                    logger.warning("%s stopped after %d tool rounds", self.name, rounds)
+                    break
+                rounds += 1
+                exchange.append({
+                    "role": "assistant",
+                    "content": [block.model_dump() for block in reply.content],
+                })
+                exchange.append({"role": "user", "content": await self._run_tools(calls)})
+
+            self._remember(conversation_id, turn, {"role": "assistant", "content": full_response})
         except anthropic.APIConnectionError as e:
             logger.error("API connection error for %s: %s", self.name, e)
             full_response = f"I'm having trouble connecting to the AI service. Please check your API key and network connection. Error: {e}"
@@ -98,11 +192,47 @@ class BaseAgent:
             logger.exception("Unexpected error in %s.chat", self.name)
             full_response = f"An unexpected error occurred: {e}"
         finally:
-            self.status = "idle"
-            self.current_task = None
+            del self._active_calls[call]
+            if self._active_calls:
+                # Other calls are still running; show the latest of them
+                self.current_task = next(reversed(self._active_calls.values()))
+            else:
+                self.status = "idle"
+                self.current_task = None
 
         return full_response
 
+    def _remember(self, conversation_id: Any, *turns: Dict[str, str]) -> None:
+        """Append an answered user/assistant pair to a conversation's history."""
+        history = self.conversation_history.setdefault(conversation_id, [])
+        history.extend(turns)
+        self.conversation_history.move_to_end(conversation_id)
+        while len(self.conversation_history) > MAX_HISTORY_CONVERSATIONS:
+            self.conversation_history.popitem(last=False)
+
+    async def _run_tools(self, calls: List[Any]) -> List[Dict[str, Any]]:
+        """Run the tool calls of one model turn concurrently.
+
+        Args:
+            calls: tool_use blocks from the model's reply.
+
+        Returns:
+            tool_result blocks, in the order of the calls.
+        """
+        async def run(call: Any) -> Dict[str, Any]:
+            if call.name in self.tools:
+                content, is_error = await self._tool_executor.run(call.name, call.input)
+            else:
+                content, is_error = f"Tool '{call.name}' is not available to {self.name}", True
+            return {
+                "type": "tool_result",
+                "tool_use_id": call.id,
+                "content": content,
+                "is_error": is_error,
+            }
+
+        return list(await asyncio.gather(*(run(call) for call in calls)))
+
     async def delegate(self, to_agent: str, task: str) -> str:
         """Delegate a task to another agent via the manager.
 
@@ -123,9 +253,12 @@ class BaseAgent:
             task=task,
         )
 
-    def clear_history(self) -> None:
-        """Clear this agent's conversation history."""
-        self.conversation_history.clear()
+    def clear_history(self, conversation_id: Any = None) -> None:
+        """Clear this agent's history of one conversation, or of all when None."""
+        if conversation_id is None:
+            self.conversation_history.clear()
+        else:
+            self.conversation_history.pop(conversation_id, None)
 
     def get_status(self) -> Dict[str, Any]:
         """Get current agent status information."""
@@ -137,5 +270,6 @@ class BaseAgent:
             "current_task": self.current_task,
             "tools": self.tools,
             "can_delegate_to": self.can_delegate_to,
-            "history_length": len(self.conversation_history),
+            "history_length": sum(len(turns) for turns in self.conversation_history.values()),
+            "model": self.model,
         }
@@ -7,7 +7,7 @@ class ResearcherAgent(BaseAgent):
     name = "Researcher"
     role = "Information Specialist"
     color = "#8B5CF6"
-    tools = ["web_search", "web_scrape", "summarize_url"]
+    tools = ["web_search", "web_scrape"]
     can_delegate_to = ["Analyst", "Writer"]
     temperature = 0.5
     persona = (
@@ -0,0 +1,173 @@
+"""Response compression and fast JSON rendering for the REST API.
+
+CompressionMiddleware compresses complete (single-message) response bodies
+above a size threshold with brotli, when it is installed and accepted, or
+gzip. Streaming responses (SSE, NDJSON, WebSocket) are passed through
+untouched so events are never held back by a compressor buffer.
+
+FastJSONResponse renders JSON with orjson when it is installed.
+"""
+
+import asyncio
+import gzip
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import COMPRESSION_MIN_SIZE
+from orchestrator.wire import JSON_CODEC
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is used instead
+    brotli = None
+
+GZIP_LEVEL = 6
+# Brotli quality 4-5 compresses better than gzip -6 at similar speed
+BROTLI_QUALITY = 4
+# Bodies at least this large are compressed in a thread to keep the event loop free
+THREAD_MIN_SIZE = 128 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+# Never buffered, even when a whole stream fits in one message
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (stdlib json fallback)."""
+
+    def render(self, content: Any) -> bytes:
+        return JSON_CODEC.encode(content).encode("utf-8")
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, or None."""
+    accepted = _accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing whole response bodies of at least minimum_size bytes."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            # First body message: compress only a complete, compressible body
+            body = message.get("body", b"")
+            headers = _Headers(start["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or headers.get("content-encoding")
+                or not _compressible(headers.get("content-type", ""))
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= THREAD_MIN_SIZE:
+                compressed = await asyncio.to_thread(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            headers.set("content-encoding", encoding)
+            headers.set("content-length", str(len(compressed)))
+            headers.add_vary("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The compressed bytes differ; a weak tag still matches If-None-Match
+                headers.set("etag", "W/" + etag)
+            start["headers"] = headers.raw
+            passthrough = True
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    if content_type.startswith(STREAMING_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class _Headers:
+    """Minimal mutable view over raw ASGI response headers."""
+
+    def __init__(self, raw: List[Tuple[bytes, bytes]]) -> None:
+        self.raw = list(raw)
+
+    def get(self, name: str, default: str = "") -> str:
+        key = name.encode("latin-1")
+        for k, v in self.raw:
+            if k.lower() == key:
+                return v.decode("latin-1")
+        return default
+
+    def set(self, name: str, value: str) -> None:
+        key = name.encode("latin-1")
+        self.raw = [(k, v) for k, v in self.raw if k.lower() != key]
+        self.raw.append((key, value.encode("latin-1")))
+
+    def add_vary(self, value: str) -> None:
+        current = self.get("vary")
+        if value.lower() not in current.lower():
+            self.set("vary", f"{current}, {value}" if current else value)
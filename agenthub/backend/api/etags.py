@@ -0,0 +1,114 @@
+"""Conditional GET support for the read-heavy dashboard endpoints.
+
+ETags are derived from cheap version counters (see db.database and
+AgentManager.agent_state_version), never from the response body, so a
+request carrying a current If-None-Match is answered 304 after reading a
+single counter. Rendered bodies are kept in a small LRU keyed by request and
+ETag, so repeated polls by clients without the ETag skip the queries too.
+Renderers may return JSON text built by SQLite, which is sent unchanged.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from fastapi import Request, Response
+
+from config import RESPONSE_CACHE_SIZE
+from orchestrator.wire import JSON_CODEC
+
+
+class ResponseCache:
+    """LRU of rendered JSON bodies, valid only for the ETag they were rendered at."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != etag:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (etag, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def _to_bytes(content: Union[str, bytes, Any]) -> bytes:
+    """Encode rendered content, passing pre-rendered JSON text through."""
+    if isinstance(content, bytes):
+        return content
+    if isinstance(content, str):
+        return content.encode("utf-8")
+    return JSON_CODEC.encode(content).encode("utf-8")
+
+
+async def conditional_json(
+    request: Request,
+    etag: str,
+    render: Callable[[], Awaitable[Any]],
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Answer 304 if the client's copy is current, else the (cached) rendered body.
+
+    Args:
+        request: The incoming request (its path and query key the cache).
+        etag: Quoted ETag of the current version of the resource.
+        render: Coroutine function producing the body: JSON text (str or
+            bytes) is sent as-is, anything else is serialized.
+        headers: Extra headers for both 200 and 304 responses.
+
+    Returns:
+        A 304 or a 200 JSON response carrying the ETag.
+    """
+    response_headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=response_headers)
+
+    key = f"{request.url.path}?{request.url.query}"
+    body = response_cache.get(key, etag)
+    if body is None:
+        body = _to_bytes(await render())
+        response_cache.put(key, etag, body)
+    return Response(content=body, media_type="application/json", headers=response_headers)
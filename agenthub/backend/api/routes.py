@@ -1,17 +1,37 @@
 """API routes for AgentHub."""
 
+import asyncio
 import logging
-from typing import Optional, List, Dict, Any
-
-from fastapi import APIRouter, HTTPException, Query
-
-from db.models import ChatRequest, ChatResponse
-from db.database import get_db
-from orchestrator.memory import MemoryManager
+import time
+from typing import Optional, List, Dict, Any, AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from api.compression import FastJSONResponse
+from api.etags import conditional_json, response_cache
+from config import BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS
+from db.models import BatchChatItem, BatchChatRequest, ChatRequest, ChatResponse
+from db.database import get_data_version, get_db
+from orchestrator.admission import Overloaded, client_key
+from orchestrator.jobs import JobQueueFull
+from orchestrator.manager import TERMINAL_TASK_STATUSES
+from orchestrator.memory import MemoryManager, invalidate_fact_cache
+from orchestrator.settings import settings as settings_store
+from orchestrator.wire import JSON_CODEC
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api")
+# Plain dict results are rendered with orjson; task and conversation endpoints
+# send JSON built by SQLite and skip Python-level rendering entirely
+router = APIRouter(prefix="/api", default_response_class=FastJSONResponse)
+
+# Events buffered per SSE stream before the agent stream is made to wait
+SSE_QUEUE_SIZE = 256
+# Idle seconds between SSE keep-alive comments (keeps proxies from timing out)
+SSE_KEEPALIVE_SECONDS = 15.0
+# Seconds between status checks when waiting on a task run by another worker
+TASK_POLL_INTERVAL = 0.5
 
 # These will be set by main.py after AgentManager is created
 _manager = None
@@ -33,27 +53,260 @@ def _get_manager():
 # ── Chat ──────────────────────────────────────────────────────────────────────
 
 
+def _client_id(request: Request) -> str:
+    """Identify the caller for per-client admission limits."""
+    return client_key(
+        request.client.host if request.client else None,
+        request.headers.getlist("x-forwarded-for"),
+    )
+
+
+async def _admit(client_id: str) -> None:
+    """Take an admission slot, or answer 429 with a Retry-After estimate."""
+    try:
+        await _get_manager().admission.acquire(client_id)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def _submit_job(request: ChatRequest, agent_name: Optional[str]) -> JSONResponse:
+    """Queue a chat for the job workers and answer 202 with its task id."""
+    manager = _get_manager()
+    try:
+        task = await manager.jobs.submit(
+            message=request.message,
+            agent_name=agent_name,
+            conversation_id=request.conversation_id,
+            timeout=request.timeout,
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JSONResponse(
+        status_code=202,
+        content=task,
+        headers={"Location": f"/api/task/{task['task_id']}"},
+    )
+
+
 @router.post("/chat", response_model=None)
-async def chat(request: ChatRequest) -> Dict[str, Any]:
-    """Process a chat message through the agent system."""
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    submit_async: bool = Query(False, alias="async", description="Return 202 at once and run in the background"),
+) -> Any:
+    """Process a chat message through the agent system.
+
+    With ?async=true the chat is queued and the response is 202 with a
+    task_id; poll /api/task/{id}?wait=N for the result. Otherwise the chat
+    needs an admission slot and is answered 429 with Retry-After when the
+    server is saturated.
+    """
+    if submit_async:
+        return await _submit_job(request, request.agent)
     manager = _get_manager()
-    result = await manager.process_message(
+    client_id = _client_id(http_request)
+    await _admit(client_id)
+    try:
+        return await manager.process_message(
+            message=request.message,
+            agent_name=request.agent,
+            conversation_id=request.conversation_id,
+            timeout=request.timeout,
+        )
+    finally:
+        manager.admission.release(client_id)
+
+
+def _format_sse(message: Dict[str, Any]) -> str:
+    """Render an event as a Server-Sent Events frame."""
+    lines = []
+    if message.get("seq") is not None:
+        lines.append(f"id: {message['seq']}")
+    lines.append(f"event: {message.get('type', 'message')}")
+    lines.append(f"data: {JSON_CODEC.encode(message.get('data', {}))}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request) -> StreamingResponse:
+    """Process a chat message and stream its events as Server-Sent Events.
+
+    Streams only this request's events: agent_thinking, agent_response tokens,
+    delegation, agent_complete and task_update for the task and its
+    delegations, then a final ``result`` event with the same body /api/chat
+    returns. A slow reader slows the agent stream rather than buffering
+    without bound. Disconnecting cancels the run. Admission is decided
+    before the stream opens, so an overloaded server answers 429.
+    """
+    manager = _get_manager()
+    client_id = _client_id(http_request)
+    await _admit(client_id)
+    events: asyncio.Queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+    job = asyncio.create_task(manager.process_message(
         message=request.message,
         agent_name=request.agent,
         conversation_id=request.conversation_id,
+        timeout=request.timeout,
+        listener=events,
+    ))
+    job.add_done_callback(lambda _: manager.admission.release(client_id))
+
+    async def stream() -> AsyncIterator[str]:
+        getter: Optional[asyncio.Future] = None
+        try:
+            # Flush headers right away so clients and proxies see the stream open
+            yield ": stream open\n\n"
+            while True:
+                if getter is None:
+                    getter = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait(
+                    {getter, job},
+                    timeout=SSE_KEEPALIVE_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if getter in done:
+                    yield _format_sse(getter.result())
+                    getter = None
+                elif job in done:
+                    getter.cancel()
+                    getter = None
+                    while not events.empty():
+                        yield _format_sse(events.get_nowait())
+                    break
+                else:
+                    yield ": keepalive\n\n"
+            yield _format_sse({"type": "result", "data": job.result()})
+        finally:
+            if getter is not None:
+                getter.cancel()
+            if not job.done():
+                job.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx and similar proxies from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request) -> StreamingResponse:
+    """Run many chats with bounded parallelism and stream results as NDJSON.
+
+    Each item runs through the normal process_message path; at most
+    ``concurrency`` (capped by BATCH_MAX_CONCURRENCY) run at once. One line is
+    written per item as soon as it finishes, so lines arrive in completion
+    order; match them up with ``index`` (position in the request) or the
+    item's own ``id``. Disconnecting cancels the items still running.
+
+    Items take admission slots like single chats, so concurrency is also
+    capped by the per-client limit. An item shed by admission control gets
+    status 'rejected' and a retry_after hint.
+    """
+    manager = _get_manager()
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch has {len(request.items)} items; the limit is {BATCH_MAX_ITEMS}",
+        )
+    client_id = _client_id(http_request)
+    concurrency = min(request.concurrency, BATCH_MAX_CONCURRENCY)
+    if manager.admission.max_per_client > 0:
+        concurrency = min(concurrency, manager.admission.max_per_client)
+    slots = asyncio.Semaphore(concurrency)
+    submitted_at = time.monotonic()
+
+    async def run_item(index: int, item: BatchChatItem) -> Dict[str, Any]:
+        async with slots:
+            started = time.monotonic()
+            line: Dict[str, Any] = {
+                "index": index,
+                "id": item.id,
+                "queued_ms": round((started - submitted_at) * 1000, 1),
+            }
+            try:
+                async with manager.admission.admit(client_id):
+                    result = await manager.process_message(
+                        message=item.message,
+                        agent_name=item.agent,
+                        conversation_id=item.conversation_id,
+                        timeout=item.timeout,
+                    )
+                line.update(result)
+            except Overloaded as e:
+                line.update({
+                    "status": "rejected",
+                    "agent": item.agent,
+                    "error": str(e),
+                    "retry_after": e.retry_after,
+                })
+            except Exception as e:
+                logger.exception("Batch item %d failed", index)
+                line.update({"status": "error", "agent": item.agent, "error": str(e)})
+            line["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+            return line
+
+    async def stream() -> AsyncIterator[str]:
+        runs = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(request.items)]
+        try:
+            for finished in asyncio.as_completed(runs):
+                yield JSON_CODEC.encode(await finished) + "\n"
+        finally:
+            for run in runs:
+                if not run.done():
+                    run.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Concurrency": str(concurrency), "X-Accel-Buffering": "no"},
     )
-    return result
 
 
 # ── Agents ────────────────────────────────────────────────────────────────────
 
 
-@router.get("/agents")
-async def get_agents() -> List[Dict[str, Any]]:
-    """Get status of all agents."""
+@router.get("/agents", response_model=None)
+async def get_agents(
+    request: Request,
+    since_version: Optional[int] = Query(None, ge=0, description="Long-poll until the state version passes this"),
+    timeout: float = Query(30.0, ge=0, le=120, description="Long-poll timeout in seconds"),
+) -> Any:
+    """Get status of all agents.
+
+    The state version is returned in the X-Agent-State-Version header and
+    in the ETag; If-None-Match with the current ETag gets 304. With
+    since_version, the request waits until some agent's status changes past
+    that version, and returns 304 if nothing changed within the timeout. A
+    since_version ahead of this worker's version (after a restart, or from
+    another worker) returns the current state at once.
+    """
     manager = _get_manager()
-    agents = manager.get_all_agents()
-    return [a.dict() for a in agents]
+    if since_version is not None and not await manager.wait_for_agent_change(since_version, timeout):
+        return Response(
+            status_code=304,
+            headers={"X-Agent-State-Version": str(manager.agent_state_version)},
+        )
+    snapshot = manager.get_agent_snapshot()
+
+    async def render() -> List[Dict[str, Any]]:
+        return snapshot["agents"]
+
+    # Versions are per process, so the worker id keeps ETags from colliding
+    return await conditional_json(
+        request,
+        f'"agents-{manager.worker_id}-{snapshot["version"]}"',
+        render,
+        headers={"X-Agent-State-Version": str(snapshot["version"])},
+    )
 
 
 @router.get("/agent/{name}")
@@ -87,215 +340,253 @@ async def get_agent(name: str) -> Dict[str, Any]:
     return details
 
 
-@router.post("/agent/{name}/chat")
-async def agent_direct_chat(name: str, request: ChatRequest) -> Dict[str, Any]:
+@router.post("/agent/{name}/chat", response_model=None)
+async def agent_direct_chat(
+    name: str,
+    request: ChatRequest,
+    http_request: Request,
+    submit_async: bool = Query(False, alias="async", description="Return 202 at once and run in the background"),
+) -> Any:
     """Chat directly with a specific agent, bypassing the Coordinator."""
     manager = _get_manager()
     if name not in manager.agents:
         raise HTTPException(status_code=404, detail=f"Agent '{name}' not found")
+    if submit_async:
+        return await _submit_job(request, name)
 
-    result = await manager.process_message(
-        message=request.message,
-        agent_name=name,
-        conversation_id=request.conversation_id,
-    )
-    return result
+    client_id = _client_id(http_request)
+    await _admit(client_id)
+    try:
+        return await manager.process_message(
+            message=request.message,
+            agent_name=name,
+            conversation_id=request.conversation_id,
+            timeout=request.timeout,
+        )
+    finally:
+        manager.admission.release(client_id)
 
 
 # ── Tasks ─────────────────────────────────────────────────────────────────────
 
 
-@router.get("/tasks")
+async def _json_array(db: Any, query: str, params: Any) -> str:
+    """Join the JSON values a query renders, one per row, into a JSON array.
+
+    SQLite does not guarantee the order in which an aggregate such as
+    json_group_array() sees its rows, so arrays are built from an ordered
+    top-level SELECT instead.
+    """
+    rows = await db.execute_fetchall(query, params)
+    return "[" + ",".join(row[0] for row in rows) + "]"
+
+
+def _json_with(obj: str, key: str, array: str) -> str:
+    """Add a rendered JSON array under key to a (non-empty) JSON object rendered by SQLite."""
+    return f'{obj[:-1]},"{key}":{array}}}'
+
+
+# Task list rows, rendered as JSON objects by SQLite
+_TASK_LIST_JSON = (
+    "json_object('id', id, 'conversation_id', conversation_id, "
+    "'parent_task_id', parent_task_id, 'description', description, "
+    "'assigned_agent', assigned_agent, 'status', status, "
+    "'result', NULLIF(substr(result, 1, 200), ''), "
+    "'created_at', created_at, 'completed_at', completed_at)"
+)
+
+
+@router.get("/tasks", response_model=None)
 async def get_tasks(
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-) -> Dict[str, Any]:
-    """Get paginated list of tasks."""
-    db = await get_db()
-    try:
-        query = "SELECT id, conversation_id, parent_task_id, description, assigned_agent, status, result, created_at, completed_at FROM tasks"
-        params: list = []
+) -> Response:
+    """Get paginated list of tasks.
 
-        if status:
-            query += " WHERE status = ?"
-            params.append(status)
+    The body is built by SQLite and sent as-is.
+    """
+    where = " WHERE status = ?" if status else ""
+    filter_params: list = [status] if status else []
 
-        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-
-        rows = await db.execute_fetchall(query, params)
-        tasks = [
-            {
-                "id": row[0],
-                "conversation_id": row[1],
-                "parent_task_id": row[2],
-                "description": row[3],
-                "assigned_agent": row[4],
-                "status": row[5],
-                "result": row[6][:200] if row[6] else None,
-                "created_at": row[7],
-                "completed_at": row[8],
-            }
-            for row in rows
-        ]
-
-        # Get total count
-        count_query = "SELECT COUNT(*) FROM tasks"
-        count_params: list = []
-        if status:
-            count_query += " WHERE status = ?"
-            count_params.append(status)
-        count_row = await db.execute_fetchall(count_query, count_params)
-        total = count_row[0][0] if count_row else 0
-
-        return {"tasks": tasks, "total": total, "limit": limit, "offset": offset}
+    db = await get_db()
+    try:
+        tasks = await _json_array(
+            db,
+            f"SELECT {_TASK_LIST_JSON} FROM tasks{where} "
+            f"ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            [*filter_params, limit, offset],
+        )
+        rows = await db.execute_fetchall(
+            f"SELECT json_object('total', (SELECT COUNT(*) FROM tasks{where}), "
+            f"'limit', ?, 'offset', ?)",
+            [*filter_params, limit, offset],
+        )
+        return Response(content=_json_with(rows[0][0], "tasks", tasks), media_type="application/json")
     finally:
         await db.close()
 
 
-@router.get("/task/{task_id}")
-async def get_task(task_id: int) -> Dict[str, Any]:
-    """Get full task details including delegations."""
+async def _wait_for_task(task_id: int, timeout: float) -> None:
+    """Wait up to timeout seconds for a task to reach a terminal status."""
+    if _manager is not None and _manager.jobs.is_tracked(task_id):
+        await _manager.jobs.wait(task_id, timeout)
+        return
+
+    # Not a job of this worker: poll its status instead
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        db = await get_db()
+        try:
+            rows = await db.execute_fetchall("SELECT status FROM tasks WHERE id = ?", (task_id,))
+        finally:
+            await db.close()
+        remaining = deadline - loop.time()
+        if not rows or rows[0][0] in TERMINAL_TASK_STATUSES or remaining <= 0:
+            return
+        await asyncio.sleep(min(TASK_POLL_INTERVAL, remaining))
+
+
+# One task, its delegations and its subtasks, rendered as JSON by SQLite
+_TASK_DETAIL_SQL = (
+    "SELECT json_object("
+    "'id', id, 'conversation_id', conversation_id, 'parent_task_id', parent_task_id, "
+    "'description', description, 'assigned_agent', assigned_agent, 'status', status, "
+    "'result', result, 'response', response, "
+    "'created_at', created_at, 'completed_at', completed_at"
+    ") FROM tasks WHERE id = ?"
+)
+_TASK_DELEGATIONS_SQL = (
+    "SELECT json_object("
+    "'id', id, 'from_agent', from_agent, 'to_agent', to_agent, "
+    "'reason', reason, 'created_at', created_at"
+    ") FROM delegations WHERE task_id = ? ORDER BY created_at, id"
+)
+_TASK_SUBTASKS_SQL = (
+    "SELECT json_object("
+    "'id', id, 'description', description, 'assigned_agent', assigned_agent, "
+    "'status', status, 'created_at', created_at, 'completed_at', completed_at"
+    ") FROM tasks WHERE parent_task_id = ? ORDER BY created_at, id"
+)
+
+
+@router.get("/task/{task_id}", response_model=None)
+async def get_task(
+    task_id: int,
+    wait: float = Query(0, ge=0, le=120, description="Seconds to wait for the task to finish"),
+) -> Response:
+    """Get full task details including delegations.
+
+    With ?wait=N the request long-polls until the task finishes or N seconds
+    pass, then returns its current state. ``result`` is a preview and
+    ``response`` the full text of a finished task (null until then). The
+    task, its delegations and subtasks are rendered to JSON by SQLite.
+    """
+    if wait:
+        await _wait_for_task(task_id, wait)
+
     db = await get_db()
     try:
-        rows = await db.execute_fetchall(
-            "SELECT id, conversation_id, parent_task_id, description, assigned_agent, "
-            "status, result, created_at, completed_at FROM tasks WHERE id = ?",
-            (task_id,),
-        )
+        rows = await db.execute_fetchall(_TASK_DETAIL_SQL, (task_id,))
         if not rows:
             raise HTTPException(status_code=404, detail="Task not found")
+        delegations = await _json_array(db, _TASK_DELEGATIONS_SQL, (task_id,))
+        subtasks = await _json_array(db, _TASK_SUBTASKS_SQL, (task_id,))
+    finally:
+        await db.close()
+    body = _json_with(_json_with(rows[0][0], "delegations", delegations), "subtasks", subtasks)
+    return Response(content=body, media_type="application/json")
 
-        row = rows[0]
-        task = {
-            "id": row[0],
-            "conversation_id": row[1],
-            "parent_task_id": row[2],
-            "description": row[3],
-            "assigned_agent": row[4],
-            "status": row[5],
-            "result": row[6],
-            "created_at": row[7],
-            "completed_at": row[8],
-        }
-
-        # Get delegations for this task
-        delegation_rows = await db.execute_fetchall(
-            "SELECT id, from_agent, to_agent, reason, created_at "
-            "FROM delegations WHERE task_id = ? ORDER BY created_at",
-            (task_id,),
-        )
-        task["delegations"] = [
-            {
-                "id": d[0],
-                "from_agent": d[1],
-                "to_agent": d[2],
-                "reason": d[3],
-                "created_at": d[4],
-            }
-            for d in delegation_rows
-        ]
 
-        # Get subtasks
-        subtask_rows = await db.execute_fetchall(
-            "SELECT id, description, assigned_agent, status, created_at, completed_at "
-            "FROM tasks WHERE parent_task_id = ? ORDER BY created_at",
-            (task_id,),
-        )
-        task["subtasks"] = [
-            {
-                "id": s[0],
-                "description": s[1],
-                "assigned_agent": s[2],
-                "status": s[3],
-                "created_at": s[4],
-                "completed_at": s[5],
-            }
-            for s in subtask_rows
-        ]
+@router.post("/task/{task_id}/cancel")
+async def cancel_task(task_id: int) -> Dict[str, Any]:
+    """Cancel a task and its whole delegation tree.
 
-        return task
-    finally:
-        await db.close()
+    Cancelling a delegated subtask cancels the top-level task it belongs to.
+    The returned status is 'cancelling' while a running tree unwinds (poll
+    /api/task/{id} for the final status), 'cancelled' for a queued job, or
+    the final status if the task had already finished.
+    """
+    manager = _get_manager()
+    status = await manager.cancel_task(task_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"task_id": task_id, "status": status}
 
 
 # ── Conversations ─────────────────────────────────────────────────────────────
 
 
-@router.get("/conversations")
+@router.get("/conversations", response_model=None)
 async def get_conversations(
+    request: Request,
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-) -> Dict[str, Any]:
-    """Get recent conversations."""
+) -> Response:
+    """Get recent conversations (supports If-None-Match)."""
     db = await get_db()
     try:
-        rows = await db.execute_fetchall(
-            "SELECT id, title, created_at, updated_at FROM conversations "
-            "ORDER BY updated_at DESC LIMIT ? OFFSET ?",
-            (limit, offset),
+        version = await get_data_version(db, "conversations")
+        return await conditional_json(
+            request, f'"conversations-{version}"', lambda: _render_conversations(db, limit, offset)
         )
-        conversations = [
-            {
-                "id": row[0],
-                "title": row[1],
-                "created_at": row[2],
-                "updated_at": row[3],
-            }
-            for row in rows
-        ]
-
-        count_row = await db.execute_fetchall("SELECT COUNT(*) FROM conversations")
-        total = count_row[0][0] if count_row else 0
-
-        return {"conversations": conversations, "total": total}
     finally:
         await db.close()
 
 
-@router.get("/conversations/{conversation_id}")
-async def get_conversation(conversation_id: int) -> Dict[str, Any]:
-    """Get full conversation with all messages."""
+async def _render_conversations(db: Any, limit: int, offset: int) -> str:
+    conversations = await _json_array(
+        db,
+        "SELECT json_object("
+        "'id', id, 'title', title, 'created_at', created_at, 'updated_at', updated_at"
+        ") FROM conversations ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?",
+        (limit, offset),
+    )
+    rows = await db.execute_fetchall(
+        "SELECT json_object('total', (SELECT COUNT(*) FROM conversations))"
+    )
+    return _json_with(rows[0][0], "conversations", conversations)
+
+
+@router.get("/conversations/{conversation_id}", response_model=None)
+async def get_conversation(conversation_id: int, request: Request) -> Response:
+    """Get full conversation with all messages (supports If-None-Match)."""
     db = await get_db()
     try:
-        conv_rows = await db.execute_fetchall(
-            "SELECT id, title, created_at, updated_at FROM conversations WHERE id = ?",
-            (conversation_id,),
+        version_rows = await db.execute_fetchall(
+            "SELECT version FROM conversations WHERE id = ?", (conversation_id,)
         )
-        if not conv_rows:
+        if not version_rows:
             raise HTTPException(status_code=404, detail="Conversation not found")
-
-        row = conv_rows[0]
-        conversation = {
-            "id": row[0],
-            "title": row[1],
-            "created_at": row[2],
-            "updated_at": row[3],
-        }
-
-        msg_rows = await db.execute_fetchall(
-            "SELECT id, role, agent_name, content, tokens_used, created_at "
-            "FROM messages WHERE conversation_id = ? ORDER BY created_at",
-            (conversation_id,),
+        etag = f'"conversation-{conversation_id}-{version_rows[0][0]}"'
+        return await conditional_json(
+            request, etag, lambda: _render_conversation(db, conversation_id)
         )
-        conversation["messages"] = [
-            {
-                "id": m[0],
-                "role": m[1],
-                "agent_name": m[2],
-                "content": m[3],
-                "tokens_used": m[4],
-                "created_at": m[5],
-            }
-            for m in msg_rows
-        ]
-
-        return conversation
     finally:
         await db.close()
 
 
+async def _render_conversation(db: Any, conversation_id: int) -> str:
+    rows = await db.execute_fetchall(
+        "SELECT json_object("
+        "'id', id, 'title', title, 'created_at', created_at, 'updated_at', updated_at"
+        ") FROM conversations WHERE id = ?",
+        (conversation_id,),
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    messages = await _json_array(
+        db,
+        "SELECT json_object("
+        "'id', id, 'role', role, 'agent_name', agent_name, 'content', content, "
+        "'tokens_used', tokens_used, 'created_at', created_at"
+        ") FROM messages WHERE conversation_id = ? ORDER BY created_at, id",
+        (conversation_id,),
+    )
+    return _json_with(rows[0][0], "messages", messages)
+
+
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: int) -> Dict[str, str]:
     """Delete a conversation and all related data."""
@@ -310,6 +601,8 @@ async def delete_conversation(conversation_id: int) -> Dict[str, str]:
 
         await db.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
         await db.commit()
+        # Facts sourced from this conversation now have source_conversation_id = NULL
+        invalidate_fact_cache()
         return {"status": "deleted"}
     finally:
         await db.close()
@@ -340,35 +633,78 @@ async def search_memory(q: str = Query(..., min_length=1)) -> Dict[str, Any]:
     return {"query": q, "results": facts, "count": len(facts)}
 
 
+@router.post("/memory/import")
+async def import_memory(request: Request) -> Dict[str, Any]:
+    """Bulk-import facts from a JSONL request body (one fact object per line).
+
+    Invalid lines are skipped and reported in ``rejected`` and ``errors``.
+    """
+    return await _memory.import_facts_jsonl(request.stream())
+
+
+@router.get("/memory/export")
+async def export_memory() -> StreamingResponse:
+    """Stream all facts as JSONL."""
+    return StreamingResponse(
+        _memory.export_facts_jsonl(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="memory.jsonl"'},
+    )
+
+
+@router.get("/memory/stats")
+async def memory_cache_stats() -> Dict[str, Any]:
+    """Get hit-rate statistics for the in-process memory cache."""
+    return _memory.cache_stats()
+
+
+@router.delete("/memory/{fact_id}")
+async def delete_memory(fact_id: int) -> Dict[str, str]:
+    """Delete a fact from long-term memory."""
+    if not await _memory.delete_fact(fact_id):
+        raise HTTPException(status_code=404, detail="Fact not found")
+    return {"status": "deleted"}
+
+
 # ── Settings ──────────────────────────────────────────────────────────────────
 
 
-@router.get("/settings")
-async def get_settings() -> Dict[str, str]:
-    """Get all settings."""
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall("SELECT key, value FROM settings")
-        return {row[0]: row[1] for row in rows}
-    finally:
-        await db.close()
+@router.get("/settings", response_model=None)
+async def get_settings(request: Request) -> Response:
+    """Get all settings from memory (supports If-None-Match)."""
+
+    async def render() -> Dict[str, str]:
+        return settings_store.all()
+
+    return await conditional_json(request, f'"settings-{settings_store.version}"', render)
 
 
 @router.put("/settings")
 async def update_settings(settings: Dict[str, str]) -> Dict[str, str]:
-    """Update settings (upsert)."""
-    db = await get_db()
+    """Update settings (upsert) in one transaction.
+
+    Runtime settings (default_model, advanced_model, max_tokens) are
+    validated and take effect on every worker without a restart. count is
+    the number of keys whose value changed.
+    """
     try:
-        for key, value in settings.items():
-            await db.execute(
-                "INSERT INTO settings (key, value) VALUES (?, ?) "
-                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
-                (key, value),
-            )
-        await db.commit()
-        return {"status": "updated", "count": str(len(settings))}
-    finally:
-        await db.close()
+        changed = await settings_store.update(settings)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if changed and _manager is not None:
+        await _manager.publish_settings_update(changed)
+    return {"status": "updated", "count": str(len(changed))}
+
+
+# ── Connections ───────────────────────────────────────────────────────────────
+
+
+@router.get("/connections")
+async def get_connections() -> Dict[str, Any]:
+    """Get per-client WebSocket queue depth, drop and lag metrics."""
+    manager = _get_manager()
+    clients = manager.get_connection_stats()
+    return {"clients": clients, "count": len(clients)}
 
 
 # ── Health ────────────────────────────────────────────────────────────────────
@@ -378,3 +714,28 @@ async def update_settings(settings: Dict[str, str]) -> Dict[str, str]:
 async def health() -> Dict[str, str]:
     """Health check endpoint."""
     return {"status": "ok"}
+
+
+@router.get("/admission")
+async def get_admission() -> Dict[str, Any]:
+    """Get in-flight, queue depth, rejection and drain-rate metrics of admission control."""
+    return _get_manager().admission.stats()
+
+
+@router.get("/cache")
+async def get_response_cache() -> Dict[str, Any]:
+    """Get hit-rate statistics of the rendered-response cache behind ETags."""
+    return response_cache.stats()
+
+
+@router.get("/tools")
+async def get_tools() -> Dict[str, Any]:
+    """Get the available tools, their call metrics and the sandbox, HTTP pool and cache state."""
+    executor = _get_manager().tool_executor
+    return {
+        "tools": executor.names,
+        "stats": executor.stats(),
+        "sandbox": executor.sandbox.stats(),
+        "http": executor.http.stats(),
+        "http_cache": executor.http_cache.stats(),
+    }
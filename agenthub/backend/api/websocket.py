@@ -1,11 +1,17 @@
 """WebSocket endpoint for real-time agent communication."""
 
 import json
+import uuid
+import asyncio
 import logging
-from typing import Any
+from typing import Any, Dict, Optional
 
 from fastapi import WebSocket, WebSocketDisconnect
 
+from orchestrator.admission import Overloaded, client_key
+from orchestrator.connections import ClientConnection
+from orchestrator.wire import negotiate
+
 logger = logging.getLogger(__name__)
 
 # Will be set by main.py
@@ -18,6 +24,107 @@ def set_manager(manager: Any) -> None:
     _manager = manager
 
 
+def _topics_error(topics: Dict[str, Any]) -> Optional[str]:
+    """Check subscribe/unsubscribe topics; returns an error message if they are invalid."""
+    for name, value in topics.items():
+        if not isinstance(value, list):
+            return "Subscription topics must be lists"
+        kind = str if name == "event_types" else int
+        # bool is an int, but never an id
+        if not all(isinstance(v, kind) and not isinstance(v, bool) for v in value):
+            return f"{name} must be a list of {'strings' if kind is str else 'integers'}"
+    return None
+
+
+async def _run_chat(
+    conn: ClientConnection,
+    client_id: str,
+    request_id: str,
+    message: str,
+    agent_name: Optional[str],
+    conversation_id: Optional[int],
+    timeout: Optional[float] = None,
+) -> None:
+    """Run one chat request in the background and report its outcome to the client."""
+    try:
+        await _manager.admission.acquire(client_id)
+    except Overloaded as e:
+        conn.send_event({
+            "type": "overloaded",
+            "data": {
+                "request_id": request_id,
+                "reason": e.reason,
+                "message": str(e),
+                "retry_after": e.retry_after,
+            },
+        })
+        return
+    except asyncio.CancelledError:
+        # Cancelled while waiting for a slot
+        conn.send_event({
+            "type": "chat_cancelled",
+            "data": {"request_id": request_id},
+        })
+        raise
+
+    try:
+        conn.send_event({
+            "type": "chat_accepted",
+            "data": {"request_id": request_id},
+        })
+        result = await _manager.process_message(
+            message=message,
+            agent_name=agent_name,
+            conversation_id=conversation_id,
+            timeout=timeout,
+        )
+        conn.send_event({
+            "type": "chat_complete",
+            "data": {**result, "request_id": request_id},
+        })
+    except asyncio.CancelledError:
+        conn.send_event({
+            "type": "chat_cancelled",
+            "data": {"request_id": request_id},
+        })
+        raise
+    except Exception as e:
+        logger.exception("Error processing WebSocket chat")
+        conn.send_event({
+            "type": "error",
+            "data": {"message": str(e), "request_id": request_id},
+        })
+    finally:
+        _manager.admission.release(client_id)
+
+
+async def _run_resume(conn: ClientConnection, conversation_id: Any, last_seq: int) -> None:
+    """Replay a conversation's missed events in the background, then send resume_complete."""
+    try:
+        # No await before replay(): live events published from here on are
+        # held back and sent after the replayed ones
+        replay = _manager.replay_events(conversation_id, last_seq)
+        # Paced by the client: waits for its queue to drain between frames
+        if not await conn.replay(replay["events"]):
+            return
+    except Exception as e:
+        logger.exception("Error replaying events")
+        conn.send_event({
+            "type": "error",
+            "data": {"message": str(e), "conversation_id": conversation_id},
+        })
+        return
+    conn.send_event({
+        "type": "resume_complete",
+        "data": {
+            "conversation_id": conversation_id,
+            "replayed": len(replay["events"]),
+            "seq": replay["seq"],
+            "gap": replay["gap"],
+        },
+    })
+
+
 async def websocket_endpoint(websocket: WebSocket) -> None:
     """Handle WebSocket connections for real-time updates.
 
@@ -27,15 +134,49 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
         - agent_complete: An agent has finished processing
         - delegation: Task delegated from one agent to another
         - task_update: Task status changed
-        - status_update: All agent statuses
+        - status_update: All agent statuses with the state version
+        - status_delta: Changed status fields since the previous delta,
+          coalesced to at most one frame per STATUS_UPDATE_INTERVAL
+        - subscribed: Current subscription filter (reply to subscribe/unsubscribe)
+        - chat_accepted: A chat request was admitted and started running (carries request_id)
+        - overloaded: A chat request was shed by admission control; carries
+          request_id, reason and retry_after (seconds), like an HTTP 429
+        - chat_complete: A chat request finished (carries request_id)
+        - chat_cancelled: A chat request was cancelled (carries request_id)
+        - resume_complete: End of a replay (reply to resume)
+        - settings_updated: Settings were written (keys, version)
         - error: Error occurred
 
     Events received from clients:
-        - chat: Process a new message
+        - chat: Process a new message in the background; several may run at once.
+          An optional request_id identifies it in replies and for cancel; an
+          optional timeout (seconds) bounds the run, which then completes
+          with status 'timed_out'.
+        - cancel: Abort the chat with the given request_id, including its delegations
         - get_status: Request agent statuses
+        - subscribe: Only receive events for the given conversation_ids,
+          task_ids (whole delegation trees; both lists of integers) and/or
+          event_types (list of strings)
+        - unsubscribe: Remove topics; with no topics, receive everything again
+        - resume: Replay missed events of conversation_id after last_seq, in
+          the background; one resume runs at a time
         - ping: Keep-alive
+
+    Every broadcast event carries a top-level ``seq``. After reconnecting, a
+    client sends resume with the last seq it saw and receives only the
+    events it missed, then resume_complete. If resume_complete has gap=true,
+    part of the history is no longer buffered and the conversation should be
+    refetched from /api/conversations/{id}.
+
+    The wire format is negotiated on connect (see orchestrator.wire): offer the
+    ``agenthub.msgpack`` subprotocol or pass ``?format=msgpack`` for compact
+    binary frames; otherwise frames are JSON text.
     """
-    await websocket.accept()
+    codec, subprotocol = negotiate(
+        websocket.scope.get("subprotocols", []),
+        websocket.query_params.get("format"),
+    )
+    await websocket.accept(subprotocol=subprotocol)
 
     if _manager is None:
         await websocket.send_text(json.dumps({
@@ -45,94 +186,178 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
         await websocket.close()
         return
 
-    _manager.websocket_connections.append(websocket)
+    conn = _manager.connect_websocket(websocket, codec=codec)
     logger.info(
         "WebSocket connected. Total connections: %d",
         len(_manager.websocket_connections),
     )
 
+    # Admission limits are per client address, shared with REST requests
+    client_host = client_key(
+        websocket.client.host if websocket.client else None,
+        websocket.headers.getlist("x-forwarded-for"),
+    )
+    if client_host == "unknown":
+        client_host = conn.client_id
+    # Chats running for this socket, keyed by request id
+    inflight: Dict[str, asyncio.Task] = {}
+    # Replay started by the last resume, if still running
+    resuming: Optional[asyncio.Task] = None
+
     # Send initial status
     try:
-        agents = _manager.get_all_agents()
-        await websocket.send_text(json.dumps({
+        conn.send_event({
             "type": "status_update",
-            "data": {"agents": [a.dict() for a in agents]},
-        }))
+            "data": _manager.get_agent_snapshot(),
+            "seq": _manager.event_seq,
+        })
     except Exception as e:
         logger.error("Error sending initial status: %s", e)
 
     try:
         while True:
-            raw = await websocket.receive_text()
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            raw = received.get("text")
+            if raw is None:
+                raw = received.get("bytes") or b""
 
             try:
-                message = json.loads(raw)
-            except json.JSONDecodeError:
-                await websocket.send_text(json.dumps({
+                message = conn.codec.decode(raw)
+                if not isinstance(message, dict):
+                    raise ValueError("Expected an object")
+            except Exception:
+                conn.send_event({
                     "type": "error",
-                    "data": {"message": "Invalid JSON"},
-                }))
+                    "data": {"message": f"Invalid {conn.codec.name} message"},
+                })
                 continue
 
             msg_type = message.get("type", "")
             data = message.get("data", {})
 
             if msg_type == "chat":
-                # Process chat message asynchronously
+                # Process chat message in the background so this loop keeps reading
                 user_message = data.get("message", "")
                 agent_name = data.get("agent")
                 conversation_id = data.get("conversation_id")
+                request_id = str(data.get("request_id") or uuid.uuid4().hex)
+                timeout = data.get("timeout")
 
                 if not user_message:
-                    await websocket.send_text(json.dumps({
+                    conn.send_event({
                         "type": "error",
-                        "data": {"message": "Empty message"},
-                    }))
+                        "data": {"message": "Empty message", "request_id": request_id},
+                    })
                     continue
 
-                try:
-                    result = await _manager.process_message(
-                        message=user_message,
-                        agent_name=agent_name,
-                        conversation_id=conversation_id,
-                    )
-                    await websocket.send_text(json.dumps({
-                        "type": "chat_complete",
-                        "data": result,
-                    }))
-                except Exception as e:
-                    logger.exception("Error processing WebSocket chat")
-                    await websocket.send_text(json.dumps({
+                if request_id in inflight:
+                    conn.send_event({
+                        "type": "error",
+                        "data": {
+                            "message": f"Request '{request_id}' is already running",
+                            "request_id": request_id,
+                        },
+                    })
+                    continue
+
+                task = asyncio.create_task(_run_chat(
+                    conn, client_host, request_id, user_message, agent_name, conversation_id,
+                    timeout if isinstance(timeout, (int, float)) and timeout > 0 else None,
+                ))
+                inflight[request_id] = task
+                task.add_done_callback(lambda _, rid=request_id: inflight.pop(rid, None))
+
+            elif msg_type == "cancel":
+                request_id = str(data.get("request_id", ""))
+                task = inflight.get(request_id)
+                if task is None:
+                    conn.send_event({
                         "type": "error",
-                        "data": {"message": str(e)},
-                    }))
+                        "data": {
+                            "message": f"No running request '{request_id}'",
+                            "request_id": request_id,
+                        },
+                    })
+                    continue
+                task.cancel()
 
             elif msg_type == "get_status":
-                agents = _manager.get_all_agents()
-                await websocket.send_text(json.dumps({
+                conn.send_event({
                     "type": "status_update",
-                    "data": {"agents": [a.dict() for a in agents]},
-                }))
+                    "data": _manager.get_agent_snapshot(),
+                })
+
+            elif msg_type in ("subscribe", "unsubscribe"):
+                topics = {
+                    "conversation_ids": data.get("conversation_ids") or [],
+                    "task_ids": data.get("task_ids") or [],
+                    "event_types": data.get("event_types") or [],
+                }
+                error = _topics_error(topics)
+                if error:
+                    conn.send_event({
+                        "type": "error",
+                        "data": {"message": error},
+                    })
+                    continue
+                if msg_type == "subscribe":
+                    current = _manager.subscriptions.subscribe(conn, **topics)
+                else:
+                    current = _manager.subscriptions.unsubscribe(conn, **topics)
+                conn.send_event({
+                    "type": "subscribed",
+                    "data": {
+                        "conversation_ids": current["conversation_id"],
+                        "task_ids": current["task_tree"],
+                        "event_types": current["event_type"],
+                    },
+                })
+
+            elif msg_type == "resume":
+                conversation_id = data.get("conversation_id")
+                last_seq = data.get("last_seq", 0)
+                if conversation_id is None or not isinstance(last_seq, int):
+                    conn.send_event({
+                        "type": "error",
+                        "data": {"message": "resume needs conversation_id and an integer last_seq"},
+                    })
+                    continue
+                if resuming is not None and not resuming.done():
+                    conn.send_event({
+                        "type": "error",
+                        "data": {"message": "A resume is already running"},
+                    })
+                    continue
+                resuming = asyncio.create_task(_run_resume(conn, conversation_id, last_seq))
 
             elif msg_type == "ping":
-                await websocket.send_text(json.dumps({
+                conn.send_event({
                     "type": "pong",
                     "data": {},
-                }))
+                })
 
             else:
-                await websocket.send_text(json.dumps({
+                conn.send_event({
                     "type": "error",
                     "data": {"message": f"Unknown message type: {msg_type}"},
-                }))
+                })
 
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
     except Exception as e:
         logger.exception("WebSocket error")
     finally:
-        if websocket in _manager.websocket_connections:
-            _manager.websocket_connections.remove(websocket)
+        # Nobody is left to receive these results; stop the agents working on them
+        background = list(inflight.values())
+        if resuming is not None:
+            background.append(resuming)
+        for task in background:
+            task.cancel()
+        if background:
+            await asyncio.gather(*background, return_exceptions=True)
+        await _manager.disconnect_websocket(conn)
         logger.info(
             "WebSocket cleaned up. Remaining connections: %d",
             len(_manager.websocket_connections),
@@ -11,4 +11,46 @@ LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 DEFAULT_MODEL: str = os.getenv("DEFAULT_MODEL", "claude-sonnet-4-20250514")
 ADVANCED_MODEL: str = os.getenv("ADVANCED_MODEL", "claude-opus-4-20250514")
 MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "4096"))
+MAX_TOOL_ROUNDS: int = int(os.getenv("MAX_TOOL_ROUNDS", "8"))
+SUBPROCESS_CONCURRENCY: int = int(os.getenv("SUBPROCESS_CONCURRENCY", "4"))
+SANDBOX_POOL_SIZE: int = int(os.getenv("SANDBOX_POOL_SIZE", "2"))
+SANDBOX_MAX_RUNS: int = int(os.getenv("SANDBOX_MAX_RUNS", "20"))
+SANDBOX_PRELOAD: str = os.getenv("SANDBOX_PRELOAD", "numpy,pandas")
+HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_MAX_PER_HOST: int = int(os.getenv("HTTP_MAX_PER_HOST", "4"))
+HTTP_DNS_CACHE_TTL: float = float(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+HTTP_CACHE_PATH: str = os.getenv("HTTP_CACHE_PATH", "")
+HTTP_CACHE_MAX_BYTES: int = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+HTTP_CACHE_SEARCH_TTL: float = float(os.getenv("HTTP_CACHE_SEARCH_TTL", "3600"))
 WORKSPACE_PATH: str = os.getenv("WORKSPACE_PATH", "/workspace")
+MEMORY_CACHE_SIZE: int = int(os.getenv("MEMORY_CACHE_SIZE", "256"))
+WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", "1000"))
+WS_MAX_DROPPED_FRAMES: int = int(os.getenv("WS_MAX_DROPPED_FRAMES", "500"))
+REPLAY_BUFFER_SIZE: int = int(os.getenv("REPLAY_BUFFER_SIZE", "2000"))
+REPLAY_MAX_CONVERSATIONS: int = int(os.getenv("REPLAY_MAX_CONVERSATIONS", "100"))
+JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+ADMISSION_MAX_INFLIGHT: int = int(os.getenv("ADMISSION_MAX_INFLIGHT", "16"))
+ADMISSION_MAX_PER_CLIENT: int = int(os.getenv("ADMISSION_MAX_PER_CLIENT", "4"))
+ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+ADMISSION_MAX_WAIT: float = float(os.getenv("ADMISSION_MAX_WAIT", "30"))
+ADMISSION_TRUSTED_PROXIES: str = os.getenv("ADMISSION_TRUSTED_PROXIES", "127.0.0.0/8,::1")
+AGENT_CONCURRENCY: int = int(os.getenv("AGENT_CONCURRENCY", "4"))
+AGENT_CONCURRENCY_LIMITS: str = os.getenv("AGENT_CONCURRENCY_LIMITS", "")
+AGENT_POOL_SIZE: int = int(os.getenv("AGENT_POOL_SIZE", "0"))
+COORDINATOR_RESERVED_SLOTS: int = int(os.getenv("COORDINATOR_RESERVED_SLOTS", "2"))
+RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "64"))
+COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+TASK_TIMEOUT: float = float(os.getenv("TASK_TIMEOUT", "600"))
+BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+STATUS_UPDATE_INTERVAL: float = float(os.getenv("STATUS_UPDATE_INTERVAL", "0.25"))
+EVENT_BUS: str = os.getenv("EVENT_BUS", "memory")
+EVENT_BUS_PATH: str = os.getenv("EVENT_BUS_PATH", "")
+EVENT_BUS_POLL_INTERVAL: float = float(os.getenv("EVENT_BUS_POLL_INTERVAL", "0.05"))
+EVENT_BUS_RETENTION_SECONDS: float = float(os.getenv("EVENT_BUS_RETENTION_SECONDS", "600"))
@@ -3,6 +3,7 @@
 import os
 import aiosqlite
 import logging
+from typing import Dict
 from config import DATABASE_PATH
 
 logger = logging.getLogger(__name__)
@@ -24,6 +25,90 @@ async def get_db() -> aiosqlite.Connection:
     return db
 
 
+async def _add_missing_columns(
+    db: aiosqlite.Connection,
+    table: str,
+    columns: Dict[str, str],
+) -> None:
+    """Add any of the given columns that an existing table lacks."""
+    rows = await db.execute_fetchall(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in rows}
+    for name, declaration in columns.items():
+        if name not in existing:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+            logger.info("Added column %s.%s", table, name)
+
+
+# Change counters behind the API's ETags and the memory fact cache.
+# data_versions holds one counter per collection; conversations.version counts
+# changes to one conversation and its messages.
+_VERSION_TRIGGERS = """
+    INSERT OR IGNORE INTO data_versions (name, version) VALUES ('conversations', 0);
+    INSERT OR IGNORE INTO data_versions (name, version) VALUES ('settings', 0);
+    INSERT OR IGNORE INTO data_versions (name, version) VALUES ('memory', 0);
+
+    CREATE TRIGGER IF NOT EXISTS trg_conversations_insert AFTER INSERT ON conversations
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'conversations';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_conversations_update
+    AFTER UPDATE OF title, updated_at ON conversations
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'conversations';
+        UPDATE conversations SET version = version + 1 WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_conversations_delete AFTER DELETE ON conversations
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'conversations';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_messages_insert AFTER INSERT ON messages
+    BEGIN
+        UPDATE conversations SET version = version + 1 WHERE id = NEW.conversation_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_messages_update AFTER UPDATE ON messages
+    BEGIN
+        UPDATE conversations SET version = version + 1 WHERE id = NEW.conversation_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_messages_delete AFTER DELETE ON messages
+    BEGIN
+        UPDATE conversations SET version = version + 1 WHERE id = OLD.conversation_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_settings_insert AFTER INSERT ON settings
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'settings';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_settings_update AFTER UPDATE ON settings
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'settings';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_settings_delete AFTER DELETE ON settings
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'settings';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_memory_insert AFTER INSERT ON memory
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'memory';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_memory_update AFTER UPDATE ON memory
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'memory';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_memory_delete AFTER DELETE ON memory
+    BEGIN
+        UPDATE data_versions SET version = version + 1 WHERE name = 'memory';
+    END;
+"""
+
+
+async def get_data_version(db: aiosqlite.Connection, name: str) -> int:
+    """Get the change counter of a collection ('conversations', 'settings' or 'memory')."""
+    rows = await db.execute_fetchall("SELECT version FROM data_versions WHERE name = ?", (name,))
+    return rows[0][0] if rows else 0
+
+
 async def init_db() -> None:
     """Create all tables if they don't exist."""
     os.makedirs(os.path.dirname(_db_path) if os.path.dirname(_db_path) else ".", exist_ok=True)
@@ -43,6 +128,7 @@ async def init_db() -> None:
             CREATE TABLE IF NOT EXISTS conversations (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 title TEXT,
+                version INTEGER DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
@@ -66,6 +152,12 @@ async def init_db() -> None:
                 assigned_agent TEXT,
                 status TEXT DEFAULT 'pending',
                 result TEXT,
+                response TEXT,
+                payload TEXT,
+                worker_id TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER DEFAULT 0,
+                cancel_requested INTEGER DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 completed_at TIMESTAMP,
                 FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
@@ -96,12 +188,32 @@ async def init_db() -> None:
                 value TEXT
             );
 
+            CREATE TABLE IF NOT EXISTS data_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            );
+
             CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id);
             CREATE INDEX IF NOT EXISTS idx_tasks_conversation ON tasks(conversation_id);
             CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
             CREATE INDEX IF NOT EXISTS idx_delegations_task ON delegations(task_id);
             CREATE INDEX IF NOT EXISTS idx_memory_importance ON memory(importance DESC);
         """)
+        # Columns added after the first release; CREATE TABLE IF NOT EXISTS
+        # leaves existing databases without them
+        await _add_missing_columns(db, "tasks", {
+            "response": "TEXT",
+            "payload": "TEXT",
+            "worker_id": "TEXT",
+            "lease_expires_at": "REAL",
+            "attempts": "INTEGER DEFAULT 0",
+            "cancel_requested": "INTEGER DEFAULT 0",
+        })
+        await _add_missing_columns(db, "conversations", {"version": "INTEGER DEFAULT 0"})
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks(status, lease_expires_at)"
+        )
+        await db.executescript(_VERSION_TRIGGERS)
         await db.commit()
         logger.info("Database initialized successfully at %s", _db_path)
     finally:
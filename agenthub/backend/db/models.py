@@ -1,13 +1,27 @@
 """Pydantic models for AgentHub API."""
 
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class ChatRequest(BaseModel):
     message: str
     agent: Optional[str] = None
     conversation_id: Optional[int] = None
+    timeout: Optional[float] = Field(None, gt=0)
+
+
+class BatchChatItem(BaseModel):
+    message: str
+    agent: Optional[str] = None
+    conversation_id: Optional[int] = None
+    timeout: Optional[float] = Field(None, gt=0)
+    id: Optional[str] = None
+
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem] = Field(..., min_length=1)
+    concurrency: int = Field(4, ge=1)
 
 
 class ChatResponse(BaseModel):
@@ -11,6 +11,8 @@ from contextlib import asynccontextmanager
 from config import LOG_LEVEL
 from db.database import init_db
 from orchestrator.manager import AgentManager
+from orchestrator.settings import settings
+from api.compression import CompressionMiddleware
 from api.routes import router, set_manager as set_routes_manager
 from api.websocket import websocket_endpoint, set_manager as set_ws_manager
 
@@ -36,8 +38,10 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Initializing AgentHub...")
     await init_db()
+    await settings.load()
 
     manager = AgentManager()
+    await manager.start()
     set_routes_manager(manager)
     set_ws_manager(manager)
 
@@ -47,12 +51,9 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down AgentHub...")
     if manager:
-        for ws in list(manager.websocket_connections):
-            try:
-                await ws.close()
-            except Exception:
-                pass
-        manager.websocket_connections.clear()
+        for conn in list(manager.websocket_connections):
+            await manager.disconnect_websocket(conn)
+        await manager.stop()
     logger.info("AgentHub stopped")
 
 
@@ -73,6 +74,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresses whole JSON/text bodies; streams and WebSockets pass through
+app.add_middleware(CompressionMiddleware)
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 
 app.include_router(router)
@@ -0,0 +1,266 @@
+"""Admission control for chat requests.
+
+Every interactive chat (REST, SSE, batch items, WebSocket) takes a slot
+before it runs. At most ``max_inflight`` chats run at once and each client
+may hold at most ``max_per_client`` slots, running or waiting. Requests
+beyond the global cap wait in a bounded FIFO queue; when the queue is full,
+the client is over its cap, or the wait is too long, the request is shed with
+an Overloaded error carrying a Retry-After estimate.
+
+Retry-After is derived from the queue drain rate: an exponentially weighted
+moving average of the time between chat completions, times the number of
+requests ahead of a newcomer.
+
+Clients are told apart by address (see client_key): behind a reverse proxy
+in ADMISSION_TRUSTED_PROXIES, the address it reports in X-Forwarded-For.
+"""
+
+import asyncio
+import math
+import time
+import logging
+import ipaddress
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Union
+
+from config import (
+    ADMISSION_MAX_INFLIGHT,
+    ADMISSION_MAX_PER_CLIENT,
+    ADMISSION_MAX_WAIT,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_TRUSTED_PROXIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the drain interval average
+DRAIN_EWMA_ALPHA = 0.2
+# Longest gap between completions counted, so an idle spell does not skew the rate
+MAX_DRAIN_SAMPLE = 60.0
+# Bounds of the Retry-After hint, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 120
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(spec: str) -> List[Network]:
+    """Parse comma-separated IP addresses and CIDR ranges."""
+    networks: List[Network] = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item.strip(), strict=False))
+        except ValueError:
+            logger.warning("Ignoring invalid trusted proxy '%s'", item.strip())
+    return networks
+
+
+_trusted_proxies = parse_networks(ADMISSION_TRUSTED_PROXIES)
+
+
+def _is_trusted(address: str, trusted: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_key(
+    peer: Optional[str],
+    forwarded_for: Iterable[str] = (),
+    trusted: Optional[List[Network]] = None,
+) -> str:
+    """Address that per-client admission limits apply to.
+
+    The peer address, unless the peer is a trusted proxy: then X-Forwarded-For
+    is read from the right (each proxy appends the address it received the
+    request from), skipping trusted proxies, and the first other address is
+    the client. Entries left of it could be forged by the client, so they
+    are never used.
+
+    Args:
+        peer: Address of the directly connected peer.
+        forwarded_for: Values of the X-Forwarded-For headers, in order.
+        trusted: Proxy networks to trust (ADMISSION_TRUSTED_PROXIES by default).
+
+    Returns:
+        The client's address, or "unknown".
+    """
+    trusted = _trusted_proxies if trusted is None else trusted
+    if not peer:
+        return "unknown"
+    if not _is_trusted(peer, trusted):
+        return peer
+    hops = [hop.strip() for value in forwarded_for for hop in value.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted):
+            return hop
+    # Only proxies in the chain (or no header): the request started inside
+    return hops[0] if hops else peer
+
+
+class Overloaded(Exception):
+    """Raised when a chat request is shed instead of admitted."""
+
+    def __init__(self, message: str, reason: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Caps concurrent chats globally and per client, with a bounded wait queue."""
+
+    def __init__(
+        self,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT,
+        max_per_client: int = ADMISSION_MAX_PER_CLIENT,
+        max_waiting: int = ADMISSION_QUEUE_SIZE,
+        max_wait: float = ADMISSION_MAX_WAIT,
+    ) -> None:
+        self.max_inflight = max_inflight
+        self.max_per_client = max_per_client
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # client id -> slots held or waited for
+        self._per_client: Dict[str, int] = {}
+        self._drain_interval: Optional[float] = None
+        self._last_release: Optional[float] = None
+
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "client_limit": 0, "wait_timeout": 0}
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, client_id: Optional[str] = None) -> None:
+        """Take a slot, waiting in the queue if all slots are busy.
+
+        Every successful acquire must be paired with release(client_id).
+
+        Raises:
+            Overloaded: If the request is shed.
+        """
+        if (
+            client_id is not None
+            and self.max_per_client > 0
+            and self._per_client.get(client_id, 0) >= self.max_per_client
+        ):
+            raise self._reject(
+                "client_limit",
+                f"Too many concurrent chats from this client (limit {self.max_per_client})",
+            )
+
+        if self.inflight < self.max_inflight and not self._waiters:
+            self._hold(client_id)
+            self.inflight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_waiting:
+            raise self._reject("queue_full", f"Server is busy ({self.waiting} chats waiting)")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._hold(client_id)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._unhold(client_id)
+            self._remove_waiter(waiter)
+            raise self._reject("wait_timeout", f"Timed out after {self.max_wait:g}s waiting for a slot")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.release(client_id)
+            else:
+                self._unhold(client_id)
+                self._remove_waiter(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self, client_id: Optional[str] = None) -> None:
+        """Give back a slot and hand it to the longest waiting request."""
+        self._unhold(client_id)
+        self._record_drain()
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes straight to the waiter; inflight is unchanged
+                waiter.set_result(None)
+                return
+        self.inflight -= 1
+
+    @asynccontextmanager
+    async def admit(self, client_id: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(client_id)
+        try:
+            yield
+        finally:
+            self.release(client_id)
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a newly queued request would be admitted."""
+        interval = self._drain_interval or 1.0
+        estimate = math.ceil((len(self._waiters) + 1) * interval)
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, estimate))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "max_per_client": self.max_per_client,
+            "clients": len(self._per_client),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "drain_per_second": round(1 / self._drain_interval, 3) if self._drain_interval else None,
+            "retry_after": self.retry_after(),
+        }
+
+    def _hold(self, client_id: Optional[str]) -> None:
+        if client_id is not None:
+            self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+
+    def _unhold(self, client_id: Optional[str]) -> None:
+        if client_id is None:
+            return
+        held = self._per_client.get(client_id, 0) - 1
+        if held > 0:
+            self._per_client[client_id] = held
+        else:
+            self._per_client.pop(client_id, None)
+
+    def _remove_waiter(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _record_drain(self) -> None:
+        now = time.monotonic()
+        if self._last_release is not None:
+            sample = min(now - self._last_release, MAX_DRAIN_SAMPLE)
+            if self._drain_interval is None:
+                self._drain_interval = sample
+            else:
+                self._drain_interval += DRAIN_EWMA_ALPHA * (sample - self._drain_interval)
+        self._last_release = now
+
+    def _reject(self, reason: str, message: str) -> Overloaded:
+        self.rejected[reason] += 1
+        return Overloaded(message, reason, self.retry_after())
@@ -0,0 +1,238 @@
+"""Per-agent concurrency bulkheads.
+
+Each agent gets its own concurrency limit and wait queue, so a flood of long
+Coder runs (or one agent's rate-limit storm) only queues work for that
+agent. Optionally all agents also draw from a shared pool in which part of
+the capacity is reserved for the Coordinator, so routing and planning keep
+moving when specialists are saturated.
+
+Slots cover a single agent.chat() call. The Coordinator's slot is released
+before its delegations run, so delegations never wait on their parent.
+Calls for one conversation run one at a time per agent (without holding a
+slot while they wait), so each sees the previous turn of its conversation;
+different conversations share the agent's slots.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Optional, Tuple
+
+from config import (
+    AGENT_CONCURRENCY,
+    AGENT_CONCURRENCY_LIMITS,
+    AGENT_POOL_SIZE,
+    COORDINATOR_RESERVED_SLOTS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """Parse per-agent limits written as ``Coder=2,Assistant=8``."""
+    limits: Dict[str, int] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        try:
+            limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            logger.warning("Ignoring invalid agent concurrency limit '%s'", item.strip())
+    return limits
+
+
+class AgentPool:
+    """Slots shared by all agents, with a share only one agent may use.
+
+    Agents other than ``reserved_for`` may hold at most size - reserved
+    slots between them; the reserved agent may use any free slot.
+    """
+
+    def __init__(self, size: int, reserved: int = 0, reserved_for: str = "Coordinator") -> None:
+        self.size = size
+        self.reserved = min(reserved, size - 1) if size > 1 else 0
+        self.reserved_for = reserved_for
+        self.in_use = 0
+        # Slots held by agents other than reserved_for
+        self.shared_in_use = 0
+        self._waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+
+    def _fits(self, name: str) -> bool:
+        if self.in_use >= self.size:
+            return False
+        return name == self.reserved_for or self.shared_in_use < self.size - self.reserved
+
+    def _take(self, name: str) -> None:
+        self.in_use += 1
+        if name != self.reserved_for:
+            self.shared_in_use += 1
+
+    async def acquire(self, name: str) -> None:
+        # Waiters only remain queued while their limit is reached, so a
+        # request that fits can go ahead of them
+        if self._fits(name):
+            self._take(name)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (name, waiter)
+        self._waiters.append(entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(name)
+            else:
+                self._waiters.remove(entry)
+            raise
+
+    def release(self, name: str) -> None:
+        self.in_use -= 1
+        if name != self.reserved_for:
+            self.shared_in_use -= 1
+        for entry in list(self._waiters):
+            if self.in_use >= self.size:
+                break
+            waiter_name, waiter = entry
+            if self._fits(waiter_name):
+                self._waiters.remove(entry)
+                self._take(waiter_name)
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "reserved": self.reserved,
+            "reserved_for": self.reserved_for,
+            "in_use": self.in_use,
+            "shared_in_use": self.shared_in_use,
+            "waiting": len(self._waiters),
+        }
+
+
+class Bulkhead:
+    """Concurrency limit, wait queue and usage metrics of one agent."""
+
+    def __init__(self, name: str, limit: int) -> None:
+        self.name = name
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self.running = 0
+        self.waiting = 0
+        # conversation -> (lock, calls holding or waiting for it); idle ones are dropped
+        self._conversations: Dict[Any, Tuple[asyncio.Lock, int]] = {}
+
+        # Metrics
+        self.max_waiting = 0
+        self.calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._busy_seconds = 0.0
+        self._created = self._changed = time.monotonic()
+
+    @asynccontextmanager
+    async def _conversation(self, key: Any) -> AsyncIterator[None]:
+        lock, users = self._conversations.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._conversations[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._conversations[key]
+            if users > 1:
+                self._conversations[key] = (lock, users - 1)
+            else:
+                del self._conversations[key]
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        pool: Optional[AgentPool] = None,
+        conversation_id: Any = None,
+    ) -> AsyncIterator[None]:
+        """Hold one of this agent's slots (and a shared pool slot) for the block.
+
+        Args:
+            pool: Shared pool to draw a slot from as well.
+            conversation_id: When given, waits first until no other call of
+                this agent for the same conversation is running.
+        """
+        if conversation_id is not None:
+            async with self._conversation(conversation_id):
+                async with self._slot(pool):
+                    yield
+        else:
+            async with self._slot(pool):
+                yield
+
+    @asynccontextmanager
+    async def _slot(self, pool: Optional[AgentPool]) -> AsyncIterator[None]:
+        queued_at = time.monotonic()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+            if pool is not None:
+                try:
+                    await pool.acquire(self.name)
+                except BaseException:
+                    self._semaphore.release()
+                    raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - queued_at
+        self.calls += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self._account()
+        self.running += 1
+        try:
+            yield
+        finally:
+            self._account()
+            self.running -= 1
+            if pool is not None:
+                pool.release(self.name)
+            self._semaphore.release()
+
+    def _account(self) -> None:
+        """Accumulate slot-seconds in use up to now."""
+        now = time.monotonic()
+        self._busy_seconds += self.running * (now - self._changed)
+        self._changed = now
+
+    def stats(self) -> Dict[str, Any]:
+        self._account()
+        uptime = max(self._changed - self._created, 1e-9)
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "calls": self.calls,
+            "avg_wait_ms": round(self.total_wait / self.calls * 1000, 1) if self.calls else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "utilization": round(self.running / self.limit, 3),
+            "avg_utilization": round(self._busy_seconds / (self.limit * uptime), 3),
+        }
+
+
+def build_bulkheads(names: Iterable[str]) -> Dict[str, Bulkhead]:
+    """Create a bulkhead per agent from AGENT_CONCURRENCY and AGENT_CONCURRENCY_LIMITS."""
+    limits = parse_limits(AGENT_CONCURRENCY_LIMITS)
+    names = list(names)
+    for unknown in set(limits) - set(names):
+        logger.warning("AGENT_CONCURRENCY_LIMITS names unknown agent '%s'", unknown)
+    return {name: Bulkhead(name, limits.get(name, AGENT_CONCURRENCY)) for name in names}
+
+
+def build_pool() -> Optional[AgentPool]:
+    """Create the shared agent pool, or None when AGENT_POOL_SIZE is 0."""
+    if AGENT_POOL_SIZE <= 0:
+        return None
+    return AgentPool(AGENT_POOL_SIZE, COORDINATOR_RESERVED_SLOTS)
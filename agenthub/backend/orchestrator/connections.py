@@ -0,0 +1,231 @@
+"""Per-client WebSocket connections with bounded outbound queues."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+from config import WS_MAX_DROPPED_FRAMES, WS_SEND_QUEUE_SIZE
+from orchestrator.wire import JSON_CODEC, Frame
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients that cannot keep up ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ClientConnection:
+    """A connected WebSocket client with its own outbound queue and writer task.
+
+    Broadcasting only enqueues; a per-client writer task drains the queue, so
+    one slow client never stalls delivery to others or the agent's stream.
+
+    Slow-consumer policy: when the queue is full, droppable frames (streaming
+    tokens) are discarded first, and a non-droppable frame evicts the oldest
+    queued token frame. If there is nothing left to drop, or more than
+    max_dropped frames are dropped before the queue drains, the client is
+    disconnected. A replay (see replay()) is exempt: it waits for the queue to
+    drain instead.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_close: Optional[Callable[["ClientConnection"], None]] = None,
+        codec: Any = JSON_CODEC,
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        max_dropped: int = WS_MAX_DROPPED_FRAMES,
+    ) -> None:
+        self.websocket = websocket
+        self.codec = codec
+        self.max_queue = max_queue
+        self.max_dropped = max_dropped
+        self.closed = False
+        self._on_close = on_close
+        self._queue: Deque[Tuple[float, bool, Frame]] = deque()
+        self._ready = asyncio.Event()
+        # Set by the writer once the queue is at most half full
+        self._room = asyncio.Event()
+        # Live frames held back while a replay is being queued
+        self._held: Optional[Deque[Tuple[float, bool, Frame]]] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._drops_since_drain = 0
+
+        client = getattr(websocket, "client", None)
+        self.client_id = f"{client.host}:{client.port}" if client else f"ws-{id(self):x}"
+        self.connected_at = time.time()
+
+        # Metrics
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_dropped = 0
+        self.max_depth = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    def start(self) -> None:
+        """Start the writer task."""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, frame: Frame, droppable: bool = False) -> bool:
+        """Enqueue a frame without waiting.
+
+        Args:
+            frame: Text or binary frame to send.
+            droppable: Whether the frame may be discarded under backpressure.
+
+        Returns:
+            False if the client is closed or was just disconnected as too slow.
+        """
+        if self.closed:
+            return False
+
+        queue = self._queue if self._held is None else self._held
+        if len(queue) >= self.max_queue:
+            if droppable:
+                self._record_drop()
+                return not self.closed
+            for i, (_, queued_droppable, _) in enumerate(queue):
+                if queued_droppable:
+                    del queue[i]
+                    self._record_drop()
+                    break
+            else:
+                self._disconnect_slow("send queue full")
+                return False
+            if self.closed:
+                return False
+
+        queue.append((time.monotonic(), droppable, frame))
+        if queue is self._queue:
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._ready.set()
+        return True
+
+    def send_event(self, message: Dict[str, Any], droppable: bool = False) -> bool:
+        """Encode an event with this client's wire format and enqueue it."""
+        return self.send(self.codec.encode(message), droppable=droppable)
+
+    async def replay(self, messages: List[Dict[str, Any]]) -> bool:
+        """Queue missed events, waiting for the queue to drain instead of dropping.
+
+        Live frames sent meanwhile are held back and queued after the replay,
+        so the client receives every replayed event before newer ones.
+
+        Args:
+            messages: Events to send, in order.
+
+        Returns:
+            False if the client was closed before the replay was queued.
+        """
+        self._held = deque()
+        try:
+            for message in messages:
+                if not await self._wait_for_room():
+                    return False
+                self._append((time.monotonic(), False, self.codec.encode(message)))
+            while self._held:
+                if not await self._wait_for_room():
+                    return False
+                self._append(self._held.popleft())
+        finally:
+            self._held = None
+        return not self.closed
+
+    async def _wait_for_room(self) -> bool:
+        while not self.closed and len(self._queue) >= self.max_queue:
+            self._room.clear()
+            await self._room.wait()
+        return not self.closed
+
+    def _append(self, item: Tuple[float, bool, Frame]) -> None:
+        self._queue.append(item)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._ready.set()
+
+    async def close(self, code: int = 1000) -> None:
+        """Stop the writer and close the socket."""
+        if self._mark_closed():
+            await self._close_socket(code)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, drop and lag metrics for this client."""
+        oldest = self._queue[0][0] if self._queue else None
+        return {
+            "client": self.client_id,
+            "format": self.codec.name,
+            "connected_at": self.connected_at,
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_depth,
+            "queue_capacity": self.max_queue,
+            "current_lag_ms": round((time.monotonic() - oldest) * 1000, 1) if oldest else 0.0,
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "frames_dropped": self.frames_dropped,
+            "closed": self.closed,
+        }
+
+    async def _write_loop(self) -> None:
+        ws = self.websocket
+        try:
+            while True:
+                while not self._queue:
+                    self._drops_since_drain = 0
+                    self._ready.clear()
+                    await self._ready.wait()
+
+                enqueued_at, _, frame = self._queue.popleft()
+                if len(self._queue) <= self.max_queue // 2:
+                    self._room.set()
+                if isinstance(frame, bytes):
+                    await ws.send_bytes(frame)
+                else:
+                    await ws.send_text(frame)
+
+                lag_ms = (time.monotonic() - enqueued_at) * 1000
+                self.last_lag_ms = lag_ms
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+                self.frames_sent += 1
+                self.bytes_sent += len(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug("WebSocket send failed for %s: %s", self.client_id, e)
+            self._mark_closed()
+
+    def _record_drop(self) -> None:
+        self.frames_dropped += 1
+        self._drops_since_drain += 1
+        if self._drops_since_drain > self.max_dropped:
+            self._disconnect_slow(f"dropped {self._drops_since_drain} frames")
+
+    def _disconnect_slow(self, reason: str) -> None:
+        logger.warning("Disconnecting slow WebSocket client %s: %s", self.client_id, reason)
+        if self._mark_closed():
+            asyncio.create_task(self._close_socket(SLOW_CONSUMER_CLOSE_CODE))
+
+    def _mark_closed(self) -> bool:
+        """Mark closed, stop the writer and notify the owner. Returns False if already closed."""
+        if self.closed:
+            return False
+        self.closed = True
+        self._queue.clear()
+        # Wake a replay waiting for room
+        self._room.set()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if self._on_close is not None:
+            self._on_close(self)
+        return True
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), timeout=5)
+        except Exception:
+            pass
@@ -0,0 +1,205 @@
+"""Event bus that carries broadcast events to every worker process.
+
+With a single uvicorn worker the in-process bus hands events straight to the
+manager. With ``--workers N`` the SQLite bus appends every event to a shared
+log file; each worker tails the log and delivers events to its own WebSocket
+clients, so a client sees tokens from chats running on any worker. Log row
+ids double as the global event sequence numbers used for resume.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiosqlite
+
+from config import (
+    DATABASE_PATH,
+    EVENT_BUS,
+    EVENT_BUS_PATH,
+    EVENT_BUS_POLL_INTERVAL,
+    EVENT_BUS_RETENTION_SECONDS,
+)
+from orchestrator.wire import JSON_CODEC
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Events read from the log per query
+POLL_BATCH_SIZE = 1000
+# Unflushed events kept before new token events are dropped
+MAX_PENDING_EVENTS = 10_000
+# Seconds between deletions of expired log rows
+PRUNE_INTERVAL = 30.0
+
+
+class InProcessEventBus:
+    """Delivers events directly to this process's handler."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._handler: Optional[Handler] = None
+        self._seq = 0
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        """Assign the next sequence number and deliver immediately."""
+        self._seq += 1
+        message["seq"] = self._seq
+        if self._handler is not None:
+            await self._handler(message)
+
+
+class SQLiteEventBus:
+    """Shares events between worker processes through an append-only SQLite log.
+
+    publish() only queues the event; a flusher task writes queued events in one
+    transaction, and a poller task reads new rows (including this worker's
+    own) in id order and hands them to the handler. Rows older than the
+    retention window are pruned.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        poll_interval: float = EVENT_BUS_POLL_INTERVAL,
+        retention_seconds: float = EVENT_BUS_RETENTION_SECONDS,
+    ) -> None:
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handler: Optional[Handler] = None
+        self._db: Optional[aiosqlite.Connection] = None
+        self._pending: List[tuple] = []
+        self._flush_wanted = asyncio.Event()
+        self._poll_wanted = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._last_id = 0
+        self.dropped = 0
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = await aiosqlite.connect(self.path, timeout=10)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_created ON events(created_at);
+        """)
+        await self._db.commit()
+        rows = await self._db.execute_fetchall("SELECT COALESCE(MAX(id), 0) FROM events")
+        self._last_id = rows[0][0]
+        self._tasks = [
+            asyncio.create_task(self._flush_loop()),
+            asyncio.create_task(self._poll_loop()),
+            asyncio.create_task(self._prune_loop()),
+        ]
+        logger.info("SQLite event bus started at %s (worker %s)", self.path, self.origin)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._db is not None:
+            try:
+                await self._flush()
+            except Exception:
+                logger.exception("Failed to flush events on shutdown")
+            await self._db.close()
+            self._db = None
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        """Queue an event for the shared log; it is delivered once read back."""
+        if len(self._pending) >= MAX_PENDING_EVENTS and message.get("type") == "agent_response":
+            self.dropped += 1
+            return
+        self._pending.append((self.origin, JSON_CODEC.encode(message), time.time()))
+        self._flush_wanted.set()
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        await self._db.executemany(
+            "INSERT INTO events (origin, payload, created_at) VALUES (?, ?, ?)", batch
+        )
+        await self._db.commit()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._flush_wanted.wait()
+            self._flush_wanted.clear()
+            try:
+                await self._flush()
+            except Exception:
+                logger.exception("Failed to write events to the bus")
+                await asyncio.sleep(self.poll_interval)
+            self._poll_wanted.set()
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                rows = await self._db.execute_fetchall(
+                    "SELECT id, payload FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                    (self._last_id, POLL_BATCH_SIZE),
+                )
+            except Exception:
+                logger.exception("Failed to read events from the bus")
+                rows = []
+            for event_id, payload in rows:
+                self._last_id = event_id
+                try:
+                    message = json.loads(payload)
+                    message["seq"] = event_id
+                    await self._handler(message)
+                except Exception:
+                    logger.exception("Failed to deliver event %d", event_id)
+            if len(rows) < POLL_BATCH_SIZE:
+                self._poll_wanted.clear()
+                try:
+                    await asyncio.wait_for(self._poll_wanted.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _prune_loop(self) -> None:
+        while True:
+            await asyncio.sleep(PRUNE_INTERVAL)
+            try:
+                await self._db.execute(
+                    "DELETE FROM events WHERE created_at < ?",
+                    (time.time() - self.retention_seconds,),
+                )
+                await self._db.commit()
+            except Exception:
+                logger.exception("Failed to prune the event log")
+
+
+def create_event_bus() -> Any:
+    """Build the event bus selected by the EVENT_BUS setting."""
+    if EVENT_BUS == "sqlite":
+        path = EVENT_BUS_PATH or os.path.join(os.path.dirname(DATABASE_PATH) or ".", "events.db")
+        return SQLiteEventBus(path)
+    if EVENT_BUS != "memory":
+        logger.warning("Unknown EVENT_BUS '%s', using the in-process bus", EVENT_BUS)
+    return InProcessEventBus()
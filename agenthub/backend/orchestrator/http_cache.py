@@ -0,0 +1,396 @@
+"""Persistent HTTP cache for the web tools.
+
+Researchers fetch the same pages and run the same searches across
+conversations. HTTPCache sits in front of SharedHTTPClient and keeps 200
+responses in a SQLite file (HTTP_CACHE_PATH, next to the database by default,
+shared by all workers), with bodies zlib-compressed:
+
+- a response is served from disk while fresh, going by its Cache-Control
+  max-age or Expires (or, with only Last-Modified, a tenth of its age up to a
+  day). ``no-store`` and ``Vary: *`` responses are not kept;
+- a stale entry with an ETag or Last-Modified is revalidated with
+  If-None-Match / If-Modified-Since, and a 304 answer serves the stored body;
+- callers may pass a ttl that replaces the response's own freshness (web
+  search result pages are not cacheable by their headers);
+- once the compressed bodies exceed HTTP_CACHE_MAX_BYTES, the least recently
+  used entries are evicted.
+
+The cache is a private (single user agent) cache, so ``private`` responses
+are kept and ``s-maxage`` is ignored. When the file cannot be opened every
+request goes to the network.
+"""
+
+import os
+import json
+import time
+import zlib
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiosqlite
+import httpx
+
+from config import DATABASE_PATH, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_PATH
+from orchestrator.http_client import SharedHTTPClient
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept with a cached body
+STORED_HEADERS = (
+    "content-type",
+    "content-language",
+    "cache-control",
+    "expires",
+    "etag",
+    "last-modified",
+    "date",
+)
+# Freshness given to responses with only Last-Modified (RFC 9111 4.2.2)
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_SECONDS = 86400.0
+# Larger bodies are compressed off the event loop
+COMPRESS_INLINE_LIMIT = 64 * 1024
+COMPRESS_LEVEL = 6
+# One entry may use at most this share of the cache
+MAX_ENTRY_FRACTION = 0.25
+
+
+def _default_path() -> str:
+    return HTTP_CACHE_PATH or os.path.join(os.path.dirname(DATABASE_PATH) or ".", "http_cache.db")
+
+
+def _cache_control(headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _lifetime(headers: Dict[str, str], now: float) -> Optional[float]:
+    """Seconds a response stays fresh, or None if it must not be stored."""
+    directives = _cache_control(headers)
+    if "no-store" in directives or headers.get("vary", "").strip() == "*":
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    try:
+        age = float(headers.get("age", 0))
+    except ValueError:
+        age = 0.0
+    date = _http_date(headers.get("date")) or now
+    if "max-age" in directives:
+        try:
+            return max(0.0, float(directives["max-age"] or 0) - age)
+        except ValueError:
+            return 0.0
+    if "expires" in headers:
+        # An invalid Expires means "already expired"
+        expires = _http_date(headers["expires"])
+        return max(0.0, expires - date - age) if expires is not None else 0.0
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX_SECONDS, max(0.0, date - last_modified) * HEURISTIC_FRACTION)
+    return 0.0
+
+
+async def _compress(body: bytes) -> bytes:
+    if len(body) > COMPRESS_INLINE_LIMIT:
+        return await asyncio.to_thread(zlib.compress, body, COMPRESS_LEVEL)
+    return zlib.compress(body, COMPRESS_LEVEL)
+
+
+async def _decompress(data: bytes, raw_size: int) -> bytes:
+    if raw_size > COMPRESS_INLINE_LIMIT:
+        return await asyncio.to_thread(zlib.decompress, data)
+    return zlib.decompress(data)
+
+
+class HTTPCache:
+    """On-disk cache of GET responses, revalidated with ETag / Last-Modified."""
+
+    def __init__(
+        self,
+        client: SharedHTTPClient,
+        path: Optional[str] = None,
+        max_bytes: int = HTTP_CACHE_MAX_BYTES,
+    ) -> None:
+        self.client = client
+        self.path = path or _default_path()
+        self.max_bytes = max_bytes
+        self._db: Optional[aiosqlite.Connection] = None
+        self._open_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._unavailable = max_bytes <= 0
+
+        # Metrics
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.bytes_saved = 0
+        self.size_bytes = 0
+        self.raw_bytes = 0
+        self.entries = 0
+
+    async def _connect(self) -> Optional[aiosqlite.Connection]:
+        if self._db is not None or self._unavailable:
+            return self._db
+        async with self._open_lock:
+            if self._db is None and not self._unavailable:
+                try:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    db = await aiosqlite.connect(self.path, timeout=10)
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA synchronous=NORMAL")
+                    await db.executescript("""
+                        CREATE TABLE IF NOT EXISTS responses (
+                            key TEXT PRIMARY KEY,
+                            status INTEGER NOT NULL,
+                            headers TEXT NOT NULL,
+                            body BLOB NOT NULL,
+                            size INTEGER NOT NULL,
+                            raw_size INTEGER NOT NULL,
+                            etag TEXT,
+                            last_modified TEXT,
+                            stored_at REAL NOT NULL,
+                            fresh_until REAL NOT NULL,
+                            last_access REAL NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access);
+                    """)
+                    await db.commit()
+                    self._db = db
+                    await self._refresh_size()
+                    logger.info("HTTP cache at %s", self.path)
+                except (OSError, aiosqlite.Error) as e:
+                    self._unavailable = True
+                    logger.warning("HTTP cache disabled, cannot open %s: %s", self.path, e)
+        return self._db
+
+    async def _refresh_size(self) -> None:
+        try:
+            rows = await self._db.execute_fetchall(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM responses"
+            )
+        except aiosqlite.Error as e:
+            logger.warning("HTTP cache size query failed: %s", e)
+            return
+        self.entries, self.size_bytes, self.raw_bytes = rows[0]
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """GET url through the cache.
+
+        Args:
+            url: URL to fetch.
+            params: Query parameters; part of the cache key.
+            ttl: Seconds to reuse the response for, instead of what its
+                headers allow.
+            **kwargs: Passed to SharedHTTPClient.get (timeout, follow_redirects, ...).
+
+        Returns:
+            The response: from disk when fresh or confirmed by a 304,
+            otherwise from the network.
+
+        Raises:
+            httpx.HTTPError: If the request fails.
+        """
+        db = await self._connect()
+        if db is None:
+            return await self.client.get(url, params=params, **kwargs)
+
+        key = str(httpx.URL(url, params=params))
+        entry = await self._lookup(key)
+        now = time.time()
+        if entry is not None and entry["fresh_until"] > now:
+            self.hits += 1
+            self.bytes_saved += entry["raw_size"]
+            await self._touch(key, now)
+            return await self._response(key, entry)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = await self.client.get(url, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            self.bytes_saved += entry["raw_size"]
+            # A 304 carries the current validators and freshness
+            stored = entry["headers"]
+            stored.update(
+                (name, value) for name, value in response.headers.items()
+                if name in STORED_HEADERS
+            )
+            lifetime = ttl if ttl is not None else _lifetime(stored, now)
+            await self._refresh(key, stored, now + (lifetime or 0.0), now)
+            return await self._response(key, entry)
+
+        self.misses += 1
+        if response.status_code == 200:
+            await self._store(key, response, ttl, now)
+        return response
+
+    async def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            rows = await self._db.execute_fetchall(
+                "SELECT status, headers, body, raw_size, etag, last_modified, fresh_until "
+                "FROM responses WHERE key = ?",
+                (key,),
+            )
+        except aiosqlite.Error as e:
+            logger.warning("HTTP cache lookup failed: %s", e)
+            return None
+        if not rows:
+            return None
+        status, headers, body, raw_size, etag, last_modified, fresh_until = rows[0]
+        return {
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "raw_size": raw_size,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh_until": fresh_until,
+        }
+
+    async def _response(self, key: str, entry: Dict[str, Any]) -> httpx.Response:
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=await _decompress(entry["body"], entry["raw_size"]),
+            request=httpx.Request("GET", key),
+        )
+
+    @asynccontextmanager
+    async def _writing(self) -> AsyncIterator[None]:
+        """One write transaction; a failed write is logged, not raised."""
+        async with self._write_lock:
+            try:
+                yield
+                await self._db.commit()
+            except aiosqlite.Error as e:
+                logger.warning("HTTP cache write failed: %s", e)
+                await self._db.rollback()
+
+    async def _touch(self, key: str, now: float) -> None:
+        async with self._writing():
+            await self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+
+    async def _refresh(self, key: str, headers: Dict[str, str], fresh_until: float, now: float) -> None:
+        async with self._writing():
+            await self._db.execute(
+                "UPDATE responses SET headers = ?, etag = ?, last_modified = ?, "
+                "fresh_until = ?, last_access = ? WHERE key = ?",
+                (
+                    json.dumps(headers),
+                    headers.get("etag"),
+                    headers.get("last-modified"),
+                    fresh_until,
+                    now,
+                    key,
+                ),
+            )
+
+    async def _store(self, key: str, response: httpx.Response, ttl: Optional[float], now: float) -> None:
+        headers = {
+            name: value for name, value in response.headers.items() if name in STORED_HEADERS
+        }
+        if ttl is not None:
+            lifetime: Optional[float] = ttl
+        else:
+            lifetime = _lifetime(dict(response.headers), now)
+            if lifetime is None:
+                return
+            if lifetime <= 0 and "etag" not in headers and "last-modified" not in headers:
+                # Could never be served: not fresh and nothing to revalidate with
+                return
+        body = response.content
+        data = await _compress(body)
+        if len(data) > self.max_bytes * MAX_ENTRY_FRACTION:
+            return
+        async with self._writing():
+            await self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, status, headers, body, size, raw_size, "
+                "etag, last_modified, stored_at, fresh_until, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    response.status_code,
+                    json.dumps(headers),
+                    data,
+                    len(data),
+                    len(body),
+                    headers.get("etag"),
+                    headers.get("last-modified"),
+                    now,
+                    now + lifetime,
+                    now,
+                ),
+            )
+            await self._evict()
+            self.stored += 1
+        await self._refresh_size()
+
+    async def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        rows = await self._db.execute_fetchall("SELECT COALESCE(SUM(size), 0) FROM responses")
+        excess = rows[0][0] - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        async with self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ) as cursor:
+            async for key, size in cursor:
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+        await self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evicted += len(victims)
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "enabled": not self._unavailable,
+            "max_bytes": self.max_bytes,
+            "entries": self.entries,
+            "size_bytes": self.size_bytes,
+            "raw_bytes": self.raw_bytes,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "stored": self.stored,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,212 @@
+"""Shared HTTP client for the web tools.
+
+One long-lived httpx.AsyncClient keeps connections (and TLS sessions) alive
+between tool calls, so a Researcher scraping several pages of one site pays
+the DNS lookup and handshake once. On top of httpx's connection limits it
+adds:
+
+- a per-host concurrency cap, so one site is never hit by more than
+  HTTP_MAX_PER_HOST requests at once;
+- a DNS cache (HTTP_DNS_CACHE_TTL seconds) in the network backend. Only the
+  TCP connect uses the cached address; TLS still verifies the hostname;
+- HTTP/2 when enabled and the optional ``h2`` package is installed.
+"""
+
+import time
+import socket
+import asyncio
+import logging
+import ipaddress
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+from config import (
+    HTTP2_ENABLED,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_MAX_PER_HOST,
+)
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - optional, HTTP/1.1 is used instead
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "AgentHub/1.0"
+KEEPALIVE_EXPIRY = 30.0
+
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that caches getaddrinfo results for ttl seconds."""
+
+    def __init__(self, ttl: float = HTTP_DNS_CACHE_TTL) -> None:
+        self.ttl = ttl
+        self._backend = httpcore.AnyIOBackend()
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """Addresses of host, from the cache while fresh."""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        key = (host, port)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port, type=socket.SOCK_STREAM
+            )
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(f"Cannot resolve {host}: {e}") from e
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if self.ttl > 0:
+            self._cache[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        addresses = await self.resolve(host, port)
+        error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address,
+                    port,
+                    timeout=timeout,
+                    local_address=local_address,
+                    socket_options=socket_options,
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        # Every cached address failed; look the host up again next time
+        self._cache.pop((host, port), None)
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+    async def connect_unix_socket(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:  # pragma: no cover - not used by the tools
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+class _CachingDNSTransport(httpx.AsyncHTTPTransport):
+    """httpx transport whose connection pool uses CachingDNSBackend."""
+
+    def __init__(self, backend: CachingDNSBackend, http2: bool, limits: httpx.Limits) -> None:
+        super().__init__(http2=http2, limits=limits)
+        # httpx does not take a network backend, so rebuild its pool with ours
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=backend,
+        )
+
+
+class SharedHTTPClient:
+    """Long-lived HTTP client with per-host concurrency caps and a DNS cache."""
+
+    def __init__(
+        self,
+        max_per_host: int = HTTP_MAX_PER_HOST,
+        http2: bool = HTTP2_ENABLED,
+    ) -> None:
+        self.max_per_host = max(1, max_per_host)
+        self.http2 = http2 and h2 is not None
+        if http2 and h2 is None:
+            logger.info("HTTP/2 disabled: the 'h2' package is not installed")
+        self.dns = CachingDNSBackend()
+        self._client: Optional[httpx.AsyncClient] = None
+        # host -> (semaphore, requests holding or waiting for it); idle hosts are dropped
+        self._host_slots: Dict[str, Tuple[asyncio.Semaphore, int]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The underlying client, created on first use."""
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            )
+            self._client = httpx.AsyncClient(
+                transport=_CachingDNSTransport(self.dns, self.http2, limits),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        host = httpx.URL(url).host
+        slot, users = self._host_slots.get(host, (None, 0))
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_per_host)
+        self._host_slots[host] = (slot, users + 1)
+        try:
+            async with slot:
+                yield
+        finally:
+            slot, users = self._host_slots[host]
+            if users > 1:
+                self._host_slots[host] = (slot, users - 1)
+            else:
+                del self._host_slots[host]
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """GET url, waiting while max_per_host requests to its host are running.
+
+        Args:
+            url: URL to fetch.
+            **kwargs: Passed to httpx.AsyncClient.get (params, timeout, ...).
+
+        Returns:
+            The response, with its body read.
+        """
+        async with self._host_slot(url):
+            return await self.client.get(url, **kwargs)
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "max_per_host": self.max_per_host,
+            "active_hosts": len(self._host_slots),
+            "dns_cache": self.dns.stats(),
+        }
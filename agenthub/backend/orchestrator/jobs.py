@@ -0,0 +1,321 @@
+"""Durable job queue for chat requests submitted without waiting for the result.
+
+Queued chats live in the ``tasks`` table itself: a submitted task is stored
+as 'pending' with its full message in ``payload``. Workers claim tasks with a
+lease (worker_id, lease_expires_at, attempts) and keep it alive with a
+heartbeat. Every worker process periodically reclaims tasks whose lease has
+expired, so work survives crashes, restarts and deploys:
+
+    - submitted chats are re-queued until JOB_MAX_ATTEMPTS is reached
+    - everything else (interactive chats, delegations, exhausted jobs) is
+      marked 'failed', since nobody is waiting for it any more
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+    JOB_QUEUE_SIZE,
+    JOB_WORKERS,
+)
+from db.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Recently finished jobs remembered, so ?wait on them returns at once
+RECENT_RESULTS = 500
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue cannot accept more work."""
+
+
+class JobQueue:
+    """Runs submitted chat tasks from the tasks table on a pool of worker coroutines.
+
+    submit() records the task as 'pending' and returns immediately. Any worker
+    coroutine in any process may claim it; it then runs through
+    AgentManager.run_task under this process's worker id.
+    """
+
+    def __init__(
+        self,
+        manager: Any,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_QUEUE_SIZE,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ) -> None:
+        self.manager = manager
+        self.workers = workers
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._running = 0
+        self._wakeup = asyncio.Event()
+        self._done: Dict[int, asyncio.Event] = {}
+        # task id -> final status; responses themselves are stored in tasks.response
+        self._results: "OrderedDict[int, str]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def worker_id(self) -> str:
+        return self.manager.worker_id
+
+    def lease_deadline(self) -> float:
+        """Lease expiry for a task claimed or renewed now."""
+        return time.time() + self.lease_seconds
+
+    async def start(self) -> None:
+        await self.recover_expired()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+        logger.info("Job queue started with %d workers (worker id %s)", self.workers, self.worker_id)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self,
+        message: str,
+        agent_name: Optional[str] = None,
+        conversation_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Create a pending task and wake a worker.
+
+        The timeout (seconds) starts counting when a worker begins the run.
+
+        Returns:
+            Dict with task_id, conversation_id, agent and status.
+
+        Raises:
+            JobQueueFull: If max_queued tasks are already pending.
+        """
+        if await self._pending_count() >= self.max_queued:
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} waiting)")
+        task = await self.manager.create_task(
+            message,
+            agent_name,
+            conversation_id,
+            status="pending",
+            payload=json.dumps({"message": message, "timeout": timeout}),
+        )
+        self._done[task["task_id"]] = asyncio.Event()
+        self._wakeup.set()
+        return task
+
+    async def wait(self, task_id: int, timeout: float) -> bool:
+        """Wait for a job submitted through this process to finish.
+
+        Returns:
+            True if the job finished, False on timeout or if it is not known here.
+        """
+        if task_id in self._results:
+            return True
+        done = self._done.get(task_id)
+        if done is None:
+            return False
+        try:
+            await asyncio.wait_for(done.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def discard(self, task_id: int) -> None:
+        """Release waiters of a job that was cancelled before it ran."""
+        done = self._done.pop(task_id, None)
+        if done is not None:
+            done.set()
+
+    def is_tracked(self, task_id: int) -> bool:
+        """Whether this process submitted the job and is waiting on it, or remembers it."""
+        return task_id in self._done or task_id in self._results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "workers": self.workers,
+            "running": self._running,
+            "capacity": self.max_queued,
+        }
+
+    async def recover_expired(self) -> Dict[str, int]:
+        """Re-queue or fail in-progress tasks whose lease has expired.
+
+        Tasks from before leases existed (no lease at all) count as expired.
+
+        Returns:
+            Dict with requeued and failed counts.
+        """
+        now = time.time()
+        db = await get_db()
+        try:
+            requeued = await db.execute(
+                "UPDATE tasks SET status = 'pending', worker_id = NULL, lease_expires_at = NULL "
+                "WHERE status = 'in_progress' "
+                "AND (lease_expires_at IS NULL OR lease_expires_at < ?) "
+                "AND parent_task_id IS NULL AND payload IS NOT NULL "
+                "AND cancel_requested = 0 AND attempts < ?",
+                (now, self.max_attempts),
+            )
+            failed = await db.execute(
+                "UPDATE tasks SET status = 'failed', worker_id = NULL, "
+                "result = COALESCE(result, 'Worker stopped before the task finished'), "
+                "completed_at = CURRENT_TIMESTAMP "
+                "WHERE status = 'in_progress' "
+                "AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (now,),
+            )
+            await db.commit()
+            counts = {"requeued": requeued.rowcount, "failed": failed.rowcount}
+        finally:
+            await db.close()
+
+        if counts["requeued"] or counts["failed"]:
+            logger.warning(
+                "Recovered tasks with expired leases: %d re-queued, %d failed",
+                counts["requeued"], counts["failed"],
+            )
+            self._wakeup.set()
+        return counts
+
+    async def _pending_count(self) -> int:
+        db = await get_db()
+        try:
+            rows = await db.execute_fetchall(
+                "SELECT COUNT(*) FROM tasks WHERE status = 'pending' AND payload IS NOT NULL"
+            )
+            return rows[0][0]
+        finally:
+            await db.close()
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest pending job and lease it to this process."""
+        db = await get_db()
+        try:
+            rows = await db.execute_fetchall(
+                "UPDATE tasks SET status = 'in_progress', worker_id = ?, "
+                "lease_expires_at = ?, attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM tasks WHERE status = 'pending' "
+                "AND payload IS NOT NULL ORDER BY id LIMIT 1) AND status = 'pending' "
+                "RETURNING id, conversation_id, assigned_agent, payload, attempts",
+                (self.worker_id, self.lease_deadline()),
+            )
+            await db.commit()
+        finally:
+            await db.close()
+        if not rows:
+            return None
+        row = rows[0]
+        payload = json.loads(row[3])
+        return {
+            "task_id": row[0],
+            "conversation_id": row[1],
+            "agent": row[2],
+            "message": payload["message"],
+            "timeout": payload.get("timeout"),
+            "attempts": row[4],
+        }
+
+    async def _renew_leases(self) -> None:
+        """Extend the lease of every task this process is running."""
+        db = await get_db()
+        try:
+            await db.execute(
+                "UPDATE tasks SET lease_expires_at = ? "
+                "WHERE worker_id = ? AND status = 'in_progress'",
+                (self.lease_deadline(), self.worker_id),
+            )
+            await db.commit()
+        finally:
+            await db.close()
+
+    async def _apply_cancel_requests(self) -> None:
+        """Cancel our running tasks that another process was asked to cancel."""
+        db = await get_db()
+        try:
+            rows = await db.execute_fetchall(
+                "SELECT id FROM tasks WHERE worker_id = ? AND status = 'in_progress' "
+                "AND cancel_requested = 1",
+                (self.worker_id,),
+            )
+        finally:
+            await db.close()
+        for (task_id,) in rows:
+            if self.manager.cancel_local(task_id):
+                logger.info("Cancelling task %d on request from another worker", task_id)
+
+    async def _maintenance(self) -> None:
+        """Apply remote cancel requests, heartbeat our leases and reclaim expired ones."""
+        lease_interval = max(self.lease_seconds / 3, 1.0)
+        last_heartbeat = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._apply_cancel_requests()
+                if time.monotonic() - last_heartbeat >= lease_interval:
+                    last_heartbeat = time.monotonic()
+                    await self._renew_leases()
+                    await self.recover_expired()
+            except Exception:
+                logger.exception("Job queue maintenance failed")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Job worker %d failed to claim a task", index)
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Another job may be waiting; let an idle worker look for it
+            self._wakeup.set()
+            self._running += 1
+            task_id = job["task_id"]
+            if job["attempts"] > 1:
+                logger.info("Re-running task %d (attempt %d)", task_id, job["attempts"])
+            try:
+                result = await self.manager.run_task(
+                    task_id=task_id,
+                    message=job["message"],
+                    target_agent=job["agent"],
+                    conversation_id=job["conversation_id"],
+                    timeout=job["timeout"],
+                )
+                # A task taken over by another process is not finished here
+                if result["status"] not in ("pending", "in_progress"):
+                    self._remember(task_id, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker %d failed on task %d", index, task_id)
+            finally:
+                self._running -= 1
+                done = self._done.pop(task_id, None)
+                if done is not None:
+                    done.set()
+
+    def _remember(self, task_id: int, result: Dict[str, Any]) -> None:
+        self._results[task_id] = result["status"]
+        while len(self._results) > RECENT_RESULTS:
+            self._results.popitem(last=False)
@@ -1,37 +1,125 @@
 """Agent Manager - orchestrates agent interactions, delegation, and task management."""
 
+import os
 import re
-import json
+import socket
+import time
+import uuid
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Coroutine, Set
 from datetime import datetime
 
 from fastapi import WebSocket
 
 from agents import ALL_AGENTS
 from agents.base import BaseAgent
+from config import STATUS_UPDATE_INTERVAL
 from db.database import get_db
+from orchestrator.admission import AdmissionController
+from orchestrator.bulkheads import build_bulkheads, build_pool
+from orchestrator.connections import ClientConnection
+from orchestrator.events import create_event_bus
+from orchestrator.jobs import JobQueue
+from orchestrator.replay import ReplayBuffer
+from orchestrator.scopes import TaskScope, effective_timeout
+from orchestrator.settings import settings
+from orchestrator.subscriptions import SubscriptionIndex
+from orchestrator.tools import ToolExecutor
+from orchestrator.wire import JSON_CODEC
 
 logger = logging.getLogger(__name__)
 
 DELEGATE_PATTERN = re.compile(r"\[DELEGATE to (\w+)\]:\s*(.+)", re.IGNORECASE)
 
+# Task statuses that will not change again
+TERMINAL_TASK_STATUSES = ("complete", "error", "cancelled", "timed_out", "failed")
+
 
 class AgentManager:
     """Manages all agent instances, task routing, and WebSocket broadcasting."""
 
-    def __init__(self) -> None:
+    def __init__(self, event_bus: Any = None) -> None:
         self.agents: Dict[str, BaseAgent] = {}
         self.active_tasks: Dict[int, Dict[str, Any]] = {}
-        self.websocket_connections: List[WebSocket] = []
+        self.websocket_connections: List[ClientConnection] = []
+        self.subscriptions = SubscriptionIndex()
+        # task_id -> root task id of its delegation tree, for task-tree subscriptions
+        self._task_roots: Dict[int, int] = {}
+        # root task id -> cancellation scope of its running tree
+        self._scopes: Dict[int, TaskScope] = {}
+        # Broadcasts go through the event bus, which numbers them and hands
+        # them back (from every worker) to _deliver; conversation events are
+        # also kept in a ring buffer for resuming clients
+        self.event_bus = event_bus or create_event_bus()
+        # Identifies this process on the task leases it holds
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.jobs = JobQueue(self)
+        self.admission = AdmissionController()
+        self.event_seq = 0
+        self.replay = ReplayBuffer()
+        # root task id -> queue receiving every event of that task tree (SSE streams)
+        self._task_listeners: Dict[int, asyncio.Queue] = {}
+        # Versioned agent state: every status/current_task change bumps the
+        # version; changes are published as coalesced status_delta frames
+        self.agent_state_version = 0
+        self._emitted_state: Dict[str, Dict[str, Any]] = {}
+        self._dirty_agents: Dict[str, set] = {}
+        self._status_flush: Optional[asyncio.TimerHandle] = None
+        self._last_status_flush = 0.0
+        self._state_changed = asyncio.Event()
+        # Fire-and-forget work (status flushes, ...), cancelled by stop()
+        self._background: Set[asyncio.Task] = set()
+        # One executor runs the tools of every agent
+        self.tool_executor = ToolExecutor()
         self._initialize_agents()
+        # Per-agent concurrency limits around every agent.chat() call
+        self.bulkheads = build_bulkheads(self.agents)
+        self.agent_pool = build_pool()
+        # Agents follow the settings store (loaded at startup) without DB reads
+        self._on_settings_changed({key: settings.get(key) for key in ("default_model", "max_tokens")})
+        settings.subscribe(self._on_settings_changed)
+
+    async def start(self) -> None:
+        """Start background services (event bus delivery, job workers, tool sandboxes)."""
+        await self.event_bus.start(self._deliver)
+        self.tool_executor.start()
+        await self.jobs.start()
+
+    async def stop(self) -> None:
+        """Stop background services."""
+        if self._status_flush is not None:
+            self._status_flush.cancel()
+            self._status_flush = None
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await self.jobs.stop()
+        await self.tool_executor.stop()
+        await self.event_bus.stop()
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """Run a coroutine in a task that stop() cancels and whose failure is logged."""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background task failed", exc_info=task.exception())
 
     def _initialize_agents(self) -> None:
         """Create instances of all agents and wire up manager references."""
         for name, agent_cls in ALL_AGENTS.items():
             agent = agent_cls()
             agent.set_manager(self)
+            agent.set_tool_executor(self.tool_executor)
+            for tool in set(agent.tools) - set(self.tool_executor.names):
+                logger.warning("Agent %s lists unknown tool '%s'", name, tool)
             self.agents[name] = agent
+            self._emitted_state[name] = self._agent_state(agent)
         logger.info("Initialized %d agents: %s", len(self.agents), list(self.agents.keys()))
 
     async def process_message(
@@ -39,6 +127,8 @@ class AgentManager:
         message: str,
         agent_name: Optional[str] = None,
         conversation_id: Optional[int] = None,
+        listener: Optional[asyncio.Queue] = None,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """Process a user message by routing to the appropriate agent.
 
@@ -46,10 +136,57 @@ class AgentManager:
             message: The user's message.
             agent_name: Optional specific agent to route to (defaults to Coordinator).
             conversation_id: Optional existing conversation to continue.
+            listener: Optional bounded queue that receives every event of this
+                task and its delegations. Streaming waits while it is full.
+            timeout: Optional deadline in seconds for the task and its delegations.
 
         Returns:
             Dict with task_id, status, conversation_id, and response.
         """
+        try:
+            task = await self.create_task(message, agent_name, conversation_id)
+        except Exception as e:
+            logger.exception("Error processing message")
+            await self._broadcast({
+                "type": "error",
+                "data": {"message": str(e), "conversation_id": conversation_id},
+            })
+            return {
+                "task_id": 0,
+                "status": "error",
+                "conversation_id": conversation_id or 0,
+                "response": f"Error processing message: {e}",
+                "agent": agent_name or "Coordinator",
+            }
+        return await self.run_task(
+            task_id=task["task_id"],
+            message=message,
+            target_agent=task["agent"],
+            conversation_id=task["conversation_id"],
+            listener=listener,
+            timeout=timeout,
+        )
+
+    async def create_task(
+        self,
+        message: str,
+        agent_name: Optional[str] = None,
+        conversation_id: Optional[int] = None,
+        status: str = "in_progress",
+        payload: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Record a user message and create its top-level task.
+
+        Args:
+            message: The user's message.
+            agent_name: Optional specific agent to route to (defaults to Coordinator).
+            conversation_id: Optional existing conversation to continue.
+            status: Initial task status ('pending' for queued jobs).
+            payload: JSON needed to re-run a queued job after a restart.
+
+        Returns:
+            Dict with task_id, conversation_id, agent and status.
+        """
         db = await get_db()
         try:
             # Create or continue conversation
@@ -73,27 +210,91 @@ class AgentManager:
             if target_agent not in self.agents:
                 target_agent = "Coordinator"
 
-            agent = self.agents[target_agent]
-
-            # Create task
+            # Create task; running tasks are leased to this worker
+            running = status == "in_progress"
             cursor = await db.execute(
-                "INSERT INTO tasks (conversation_id, description, assigned_agent, status) "
-                "VALUES (?, ?, ?, ?)",
-                (conversation_id, message[:200], target_agent, "in_progress"),
+                "INSERT INTO tasks (conversation_id, description, assigned_agent, status, "
+                "payload, worker_id, lease_expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    conversation_id, message[:200], target_agent, status, payload,
+                    self.worker_id if running else None,
+                    self.jobs.lease_deadline() if running else None,
+                ),
             )
             task_id = cursor.lastrowid
             await db.commit()
 
+            return {
+                "task_id": task_id,
+                "conversation_id": conversation_id,
+                "agent": target_agent,
+                "status": status,
+            }
+        finally:
+            await db.close()
+
+    async def run_task(
+        self,
+        task_id: int,
+        message: str,
+        target_agent: str,
+        conversation_id: int,
+        listener: Optional[asyncio.Queue] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Run a task created by create_task through its agent and delegations.
+
+        The run gets a cancellation scope; cancel_task() or its deadline stop
+        it and it returns with status 'cancelled' or 'timed_out'. Cancelling
+        the calling asyncio task still raises CancelledError as before.
+
+        Args:
+            task_id: The top-level task to run.
+            message: The user's message.
+            target_agent: Agent assigned to the task.
+            conversation_id: Conversation the task belongs to.
+            listener: Optional bounded queue that receives every event of this
+                task and its delegations. Streaming waits while it is full.
+            timeout: Optional deadline in seconds, capped by TASK_TIMEOUT.
+
+        Returns:
+            Dict with task_id, status, conversation_id, response and agent.
+        """
+        scope = TaskScope(task_id, effective_timeout(timeout))
+        self._scopes[task_id] = scope
+        db = await get_db()
+        try:
+            # Only take a task that is still pending or already leased to this
+            # process; it may have been cancelled, finished or re-leased meanwhile
+            cursor = await db.execute(
+                "UPDATE tasks SET status = 'in_progress', worker_id = ?, lease_expires_at = ? "
+                "WHERE id = ? AND (status = 'pending' "
+                "OR (status = 'in_progress' AND worker_id = ?))",
+                (self.worker_id, self.jobs.lease_deadline(), task_id, self.worker_id),
+            )
+            await db.commit()
+            if cursor.rowcount == 0:
+                return await self._untaken_task(db, task_id, target_agent, conversation_id)
+
+            agent = self.agents[target_agent]
+
             self.active_tasks[task_id] = {
                 "agent": target_agent,
                 "status": "in_progress",
                 "started_at": datetime.utcnow().isoformat(),
             }
+            self._task_roots[task_id] = task_id
+            if listener is not None:
+                self._task_listeners[task_id] = listener
 
             # Broadcast thinking status
             await self._broadcast({
                 "type": "agent_thinking",
-                "data": {"agent": target_agent, "task_id": task_id},
+                "data": {
+                    "agent": target_agent,
+                    "task_id": task_id,
+                    "conversation_id": conversation_id,
+                },
             })
 
             # Stream response
@@ -114,7 +315,10 @@ class AgentManager:
 
             # Reset full_response since chat() builds it internally
             full_response = ""
-            response = await agent.chat(message, on_token=on_token)
+            async with self.bulkheads[target_agent].slot(self.agent_pool, conversation_id):
+                response = await agent.chat(
+                    message, on_token=on_token, conversation_id=conversation_id
+                )
             full_response = response
 
             # Broadcast completion
@@ -146,11 +350,11 @@ class AgentManager:
                 (conversation_id, "assistant", target_agent, full_response),
             )
 
-            # Update task status
+            # Update task status; result is a preview, response the full text
             await db.execute(
-                "UPDATE tasks SET status = ?, result = ?, completed_at = CURRENT_TIMESTAMP "
-                "WHERE id = ?",
-                ("complete", full_response[:1000], task_id),
+                "UPDATE tasks SET status = ?, result = ?, response = ?, "
+                "completed_at = CURRENT_TIMESTAMP WHERE id = ?",
+                ("complete", full_response[:1000], full_response, task_id),
             )
             await db.commit()
 
@@ -169,6 +373,7 @@ class AgentManager:
                     "task_id": task_id,
                     "status": "complete",
                     "agent": target_agent,
+                    "conversation_id": conversation_id,
                 },
             })
 
@@ -180,21 +385,73 @@ class AgentManager:
                 "agent": target_agent,
             }
 
+        except asyncio.CancelledError:
+            status = scope.reason or "cancelled"
+            logger.info("Task %d %s", task_id, status)
+            await self._finish_cancelled(db, task_id, target_agent, conversation_id, status)
+            # Only swallow cancellations this scope made itself
+            if scope.reason is None or asyncio.current_task().uncancel() > 0:
+                raise
+            return {
+                "task_id": task_id,
+                "status": status,
+                "conversation_id": conversation_id,
+                "response": (
+                    f"Task timed out after {scope.timeout:g}s."
+                    if status == "timed_out" else "Task cancelled."
+                ),
+                "agent": target_agent,
+            }
         except Exception as e:
             logger.exception("Error processing message")
+            self.active_tasks.pop(task_id, None)
+            try:
+                await db.execute(
+                    "UPDATE tasks SET status = ?, result = ?, response = ?, "
+                    "completed_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    ("error", str(e)[:1000], f"Error processing message: {e}", task_id),
+                )
+                await db.commit()
+            except Exception:
+                logger.exception("Failed to mark task %d as errored", task_id)
             await self._broadcast({
                 "type": "error",
-                "data": {"message": str(e)},
+                "data": {
+                    "message": str(e),
+                    "task_id": task_id,
+                    "conversation_id": conversation_id,
+                },
             })
             return {
-                "task_id": 0,
+                "task_id": task_id,
                 "status": "error",
-                "conversation_id": conversation_id or 0,
+                "conversation_id": conversation_id,
                 "response": f"Error processing message: {e}",
-                "agent": agent_name or "Coordinator",
+                "agent": target_agent,
             }
         finally:
+            scope.close()
+            self._scopes.pop(task_id, None)
             await db.close()
+            self._task_listeners.pop(task_id, None)
+            self._forget_task_tree(task_id)
+
+    async def _untaken_task(
+        self, db: Any, task_id: int, target_agent: str, conversation_id: int
+    ) -> Dict[str, Any]:
+        """Result of a run_task call for a task that could not be taken."""
+        rows = await db.execute_fetchall(
+            "SELECT status, response FROM tasks WHERE id = ?", (task_id,)
+        )
+        status, response = rows[0] if rows else ("missing", None)
+        logger.info("Not running task %d: it is %s", task_id, status)
+        return {
+            "task_id": task_id,
+            "status": status,
+            "conversation_id": conversation_id,
+            "response": response or f"Task is {status.replace('_', ' ')}.",
+            "agent": target_agent,
+        }
 
     async def _process_delegations(
         self,
@@ -253,15 +510,25 @@ class AgentManager:
 
         agent = self.agents[to_agent]
 
+        subtask_id: Optional[int] = None
         db = await get_db()
         try:
             # Create subtask
             cursor = await db.execute(
                 "INSERT INTO tasks (conversation_id, parent_task_id, description, "
-                "assigned_agent, status) VALUES (?, ?, ?, ?, ?)",
-                (conversation_id, parent_task_id, task[:200], to_agent, "in_progress"),
+                "assigned_agent, status, worker_id, lease_expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    conversation_id, parent_task_id, task[:200], to_agent, "in_progress",
+                    self.worker_id, self.jobs.lease_deadline(),
+                ),
             )
             subtask_id = cursor.lastrowid
+            self._task_roots[subtask_id] = (
+                self._task_roots.get(parent_task_id, parent_task_id)
+                if parent_task_id is not None
+                else subtask_id
+            )
 
             # Record delegation
             await db.execute(
@@ -279,13 +546,19 @@ class AgentManager:
                     "to_agent": to_agent,
                     "task": task[:200],
                     "task_id": subtask_id,
+                    "parent_task_id": parent_task_id,
+                    "conversation_id": conversation_id,
                 },
             })
 
             # Broadcast thinking
             await self._broadcast({
                 "type": "agent_thinking",
-                "data": {"agent": to_agent, "task_id": subtask_id},
+                "data": {
+                    "agent": to_agent,
+                    "task_id": subtask_id,
+                    "conversation_id": conversation_id,
+                },
             })
 
             # Execute delegation
@@ -300,7 +573,10 @@ class AgentManager:
                     },
                 })
 
-            response = await agent.chat(task, on_token=on_token)
+            async with self.bulkheads[to_agent].slot(self.agent_pool, conversation_id):
+                response = await agent.chat(
+                    task, on_token=on_token, conversation_id=conversation_id
+                )
 
             # Save to messages
             await db.execute(
@@ -311,9 +587,9 @@ class AgentManager:
 
             # Update subtask
             await db.execute(
-                "UPDATE tasks SET status = ?, result = ?, completed_at = CURRENT_TIMESTAMP "
-                "WHERE id = ?",
-                ("complete", response[:1000], subtask_id),
+                "UPDATE tasks SET status = ?, result = ?, response = ?, "
+                "completed_at = CURRENT_TIMESTAMP WHERE id = ?",
+                ("complete", response[:1000], response, subtask_id),
             )
             await db.commit()
 
@@ -329,34 +605,309 @@ class AgentManager:
 
             return response
 
+        except asyncio.CancelledError:
+            if subtask_id is not None:
+                status = self._cancel_reason(subtask_id)
+                logger.info("Delegated task %d %s", subtask_id, status)
+                await self._finish_cancelled(db, subtask_id, to_agent, conversation_id, status)
+            raise
         except Exception as e:
             logger.exception("Error in delegation from %s to %s", from_agent, to_agent)
             return f"Delegation error: {e}"
         finally:
             await db.close()
 
+    async def _finish_cancelled(
+        self,
+        db: Any,
+        task_id: int,
+        agent_name: str,
+        conversation_id: Optional[int],
+        status: str = "cancelled",
+    ) -> None:
+        """Record a cancelled or timed-out task and tell clients, while cancellation unwinds."""
+        self.active_tasks.pop(task_id, None)
+        try:
+            await db.execute(
+                "UPDATE tasks SET status = ?, completed_at = CURRENT_TIMESTAMP "
+                "WHERE id = ? AND status = 'in_progress'",
+                (status, task_id),
+            )
+            await db.commit()
+        except Exception:
+            logger.exception("Failed to mark task %d %s", task_id, status)
+        await self._broadcast({
+            "type": "task_update",
+            "data": {
+                "task_id": task_id,
+                "status": status,
+                "agent": agent_name,
+                "conversation_id": conversation_id,
+            },
+        })
+
+    def _cancel_reason(self, task_id: int) -> str:
+        """Status to record for a task whose tree is being cancelled."""
+        scope = self._scopes.get(self._task_roots.get(task_id, task_id))
+        return scope.reason if scope is not None and scope.reason else "cancelled"
+
+    def cancel_local(self, task_id: int) -> bool:
+        """Cancel the tree containing task_id if it runs in this process.
+
+        Returns:
+            True if a running tree was found here.
+        """
+        scope = self._scopes.get(self._task_roots.get(task_id, task_id))
+        if scope is None:
+            return False
+        scope.cancel()
+        return True
+
+    async def cancel_task(self, task_id: int) -> Optional[str]:
+        """Cancel a task together with its whole delegation tree.
+
+        Running trees of this process are cancelled at once. Queued jobs are
+        cancelled in the database before any worker picks them up. Tasks run
+        by another worker process are flagged; that worker cancels them on
+        its next cancellation check.
+
+        Returns:
+            'cancelling' if a running tree was signalled, 'cancelled' for a
+            queued job, the final status of a task that had already finished,
+            or None if the task does not exist.
+        """
+        if self.cancel_local(task_id):
+            return "cancelling"
+
+        db = await get_db()
+        try:
+            rows = await db.execute_fetchall(
+                "SELECT status, conversation_id, assigned_agent FROM tasks WHERE id = ?",
+                (task_id,),
+            )
+            if not rows:
+                return None
+            status, conversation_id, agent_name = rows[0]
+            if status in TERMINAL_TASK_STATUSES:
+                return status
+
+            if status == "pending":
+                cursor = await db.execute(
+                    "UPDATE tasks SET status = 'cancelled', completed_at = CURRENT_TIMESTAMP "
+                    "WHERE id = ? AND status = 'pending'",
+                    (task_id,),
+                )
+                await db.commit()
+                if cursor.rowcount:
+                    self.jobs.discard(task_id)
+                    await self._broadcast({
+                        "type": "task_update",
+                        "data": {
+                            "task_id": task_id,
+                            "status": "cancelled",
+                            "agent": agent_name,
+                            "conversation_id": conversation_id,
+                        },
+                    })
+                    return "cancelled"
+
+            # Claimed in the meantime or running elsewhere
+            await db.execute("UPDATE tasks SET cancel_requested = 1 WHERE id = ?", (task_id,))
+            await db.commit()
+            return "cancelling"
+        finally:
+            await db.close()
+
+    def _forget_task_tree(self, root_task_id: int) -> None:
+        """Drop root mappings once a top-level task has finished."""
+        for task_id in [t for t, root in self._task_roots.items() if root == root_task_id]:
+            del self._task_roots[task_id]
+
+    def connect_websocket(self, ws: WebSocket, codec: Any = None) -> ClientConnection:
+        """Register a WebSocket; it receives every event until it subscribes.
+
+        Args:
+            ws: The accepted WebSocket.
+            codec: Negotiated wire format (defaults to JSON).
+
+        Returns:
+            The ClientConnection that owns the socket's outbound queue.
+        """
+        conn = ClientConnection(ws, on_close=self._forget_connection, codec=codec or JSON_CODEC)
+        self.websocket_connections.append(conn)
+        self.subscriptions.add(conn)
+        conn.start()
+        return conn
+
+    async def disconnect_websocket(self, conn: ClientConnection) -> None:
+        """Close a client connection and drop its subscriptions."""
+        await conn.close()
+        self._forget_connection(conn)
+
+    def _forget_connection(self, conn: ClientConnection) -> None:
+        if conn in self.websocket_connections:
+            self.websocket_connections.remove(conn)
+        self.subscriptions.remove(conn)
+
+    def get_connection_stats(self) -> List[Dict[str, Any]]:
+        """Get per-client queue depth, drop and lag metrics."""
+        return [conn.stats() for conn in self.websocket_connections]
+
+    def replay_events(self, conversation_id: int, last_seq: int) -> Dict[str, Any]:
+        """Get the buffered events of a conversation that a client missed.
+
+        Args:
+            conversation_id: Conversation to resume.
+            last_seq: Last sequence number the client saw.
+
+        Returns:
+            Dict with the missed events, the current sequence number, and
+            gap=True if some missed events are no longer buffered.
+        """
+        events, gap = self.replay.since(conversation_id, last_seq)
+        return {"events": events, "seq": self.event_seq, "gap": gap}
+
     async def _broadcast(self, message: dict) -> None:
-        """Send a message to all connected WebSocket clients."""
-        disconnected = []
-        payload = json.dumps(message)
+        """Publish an event to subscribed clients on every worker.
 
-        for ws in self.websocket_connections:
-            try:
-                await ws.send_text(payload)
-            except Exception:
-                disconnected.append(ws)
+        Never waits on WebSocket clients: each client's writer task delivers
+        it. A task listener (SSE stream) that is full does make this wait,
+        which throttles the agent stream to the pace of that one reader.
+        """
+        data = message.get("data", {})
+        task_id = data.get("task_id")
+        task_tree = self._task_roots.get(task_id, task_id)
+        if task_tree != task_id:
+            # Other workers don't know this task's tree; carry it with the event
+            data["root_task_id"] = task_tree
+
+        await self.event_bus.publish(message)
+
+        # The chat behind a listener always runs on this worker
+        listener = self._task_listeners.get(task_tree)
+        if listener is not None:
+            await listener.put(message)
+
+    def _on_settings_changed(self, values: Dict[str, Any]) -> None:
+        for agent in self.agents.values():
+            agent.apply_settings(values)
+
+    async def publish_settings_update(self, keys: List[str]) -> None:
+        """Tell clients and other workers that settings were written."""
+        await self._broadcast({
+            "type": "settings_updated",
+            "data": {"keys": keys, "version": settings.version},
+        })
 
-        for ws in disconnected:
-            self.websocket_connections.remove(ws)
+    async def _deliver(self, message: dict) -> None:
+        """Enqueue a sequenced event for this worker's subscribed WebSocket clients."""
+        self.event_seq = max(self.event_seq, message["seq"])
+        data = message.get("data", {})
+        if message.get("type") == "settings_updated" and data.get("version", 0) > settings.version:
+            # Written by another worker: refresh our in-memory copy
+            self._spawn(settings.load(at_least=data["version"]))
+        if data.get("conversation_id") is not None:
+            self.replay.record(data["conversation_id"], message)
+
+        task_id = data.get("task_id")
+        task_tree = data.get("root_task_id") or self._task_roots.get(task_id, task_id)
+        recipients = self.subscriptions.recipients(
+            event_type=message.get("type", ""),
+            conversation_id=data.get("conversation_id"),
+            task_tree=task_tree,
+        )
+        if not recipients:
+            return
+
+        # Intermediate tokens are the only frames a lagging client may lose
+        droppable = message.get("type") == "agent_response"
+        # Serialize once per wire format, not once per client
+        frames: Dict[str, Any] = {}
+
+        for conn in recipients:
+            codec = conn.codec
+            frame = frames.get(codec.name)
+            if frame is None:
+                frame = frames[codec.name] = codec.encode(message)
+            conn.send(frame, droppable=droppable)
 
     async def broadcast_status(self) -> None:
         """Send current status of all agents to all WebSocket connections."""
-        statuses = self.get_all_agents()
         await self._broadcast({
             "type": "status_update",
-            "data": {"agents": [s.dict() for s in statuses]},
+            "data": self.get_agent_snapshot(),
         })
 
+    @staticmethod
+    def _agent_state(agent: BaseAgent) -> Dict[str, Any]:
+        return {"name": agent.name, "status": agent.status, "current_task": agent.current_task}
+
+    def get_agent_snapshot(self) -> Dict[str, Any]:
+        """Get every agent's status with the state version it reflects."""
+        return {
+            "version": self.agent_state_version,
+            "agents": [self._agent_state(agent) for agent in self.agents.values()],
+        }
+
+    def on_agent_state_change(self, name: str, field: str) -> None:
+        """Record an agent status change and schedule a coalesced delta frame."""
+        self.agent_state_version += 1
+        self._dirty_agents.setdefault(name, set()).add(field)
+        # Wake long-pollers; later waiters get a fresh event
+        self._state_changed.set()
+        self._state_changed = asyncio.Event()
+
+        if self._status_flush is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        delay = max(0.0, self._last_status_flush + STATUS_UPDATE_INTERVAL - time.monotonic())
+        self._status_flush = loop.call_later(
+            delay, lambda: self._spawn(self._flush_status_delta())
+        )
+
+    async def _flush_status_delta(self) -> None:
+        """Publish the fields that changed since the last delta frame."""
+        self._status_flush = None
+        self._last_status_flush = time.monotonic()
+        dirty, self._dirty_agents = self._dirty_agents, {}
+
+        changes: Dict[str, Dict[str, Any]] = {}
+        for name, fields in dirty.items():
+            current = self._agent_state(self.agents[name])
+            emitted = self._emitted_state[name]
+            changed = {f: current[f] for f in fields if current[f] != emitted.get(f)}
+            if changed:
+                emitted.update(changed)
+                changes[name] = changed
+        if changes:
+            await self._broadcast({
+                "type": "status_delta",
+                "data": {"version": self.agent_state_version, "agents": changes},
+            })
+
+    async def wait_for_agent_change(self, since_version: int, timeout: float) -> bool:
+        """Wait until the agent state version passes since_version.
+
+        The version is a counter of this process: it restarts at 0 and
+        differs between workers. A since_version ahead of it was issued by
+        another process, so it counts as changed and returns at once.
+
+        Returns:
+            True if the state changed (or since_version is not from this
+            process's current count), False on timeout.
+        """
+        if since_version > self.agent_state_version:
+            return True
+        while self.agent_state_version <= since_version:
+            try:
+                await asyncio.wait_for(self._state_changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
     def get_all_agents(self) -> List[Any]:
         """Get status of all agents."""
         from db.models import AgentStatus
@@ -370,8 +921,13 @@ class AgentManager:
         return result
 
     def get_agent_details(self, name: str) -> Optional[Dict[str, Any]]:
-        """Get detailed info about a specific agent."""
+        """Get detailed info about a specific agent, including concurrency and tool metrics."""
         agent = self.agents.get(name)
         if agent is None:
             return None
-        return agent.get_status()
+        details = agent.get_status()
+        details["concurrency"] = self.bulkheads[name].stats()
+        if self.agent_pool is not None:
+            details["concurrency"]["pool"] = self.agent_pool.stats()
+        details["tool_stats"] = self.tool_executor.stats(agent.tools)
+        return details
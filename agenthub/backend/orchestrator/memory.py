@@ -1,18 +1,110 @@
 """Memory manager for long-term fact storage and conversation context."""
 
+import json
+import math
 import logging
-from typing import List, Dict, Optional, Any
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator
 
-from db.database import get_db
+from config import MEMORY_CACHE_SIZE
+from db.database import get_data_version, get_db
 
 logger = logging.getLogger(__name__)
 
+# Rows per executemany/commit during bulk import
+IMPORT_BATCH_SIZE = 5000
+# Rows fetched per round trip during export
+EXPORT_FETCH_SIZE = 1000
+# Longest accepted JSONL line during import
+MAX_IMPORT_LINE_BYTES = 1_000_000
+# Range of SQLite INTEGER values
+SQLITE_MIN_INT = -(2 ** 63)
+SQLITE_MAX_INT = 2 ** 63 - 1
+
+
+class FactCache:
+    """Size-bounded LRU cache of memory query results.
+
+    Entries are stamped with the 'memory' data version (a database counter
+    bumped by triggers on every write, from any worker) read before their
+    query ran. A lookup passes the current data version and only gets an
+    entry with that same stamp, so results computed before (or during) a
+    write anywhere are never served afterwards.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        # Newest data version seen
+        self.version = 0
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[int, List[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple[Any, ...], version: int) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the result cached for key at data version, or None on a miss."""
+        self.version = max(self.version, version)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return [dict(fact) for fact in entry[1]]
+
+    def put(self, key: Tuple[Any, ...], version: int, value: List[Dict[str, Any]]) -> None:
+        """Store a result computed against the given data version."""
+        if self.max_entries <= 0 or version < self.version:
+            # Disabled, or a newer version was seen while the query was running
+            return
+        self._entries[key] = (version, [dict(fact) for fact in value])
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Drop every cached result (the data version makes them unusable anyway)."""
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit-rate and size statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Shared by every MemoryManager of this process; other workers have their
+# own, kept in step through the 'memory' data version
+_fact_cache = FactCache(MEMORY_CACHE_SIZE)
+
+
+def invalidate_fact_cache() -> None:
+    """Free cached memory reads after a write outside MemoryManager.
+
+    The data version triggers already keep stale entries from being served;
+    this only releases their memory early, e.g. after deleting a
+    conversation (which nulls source_conversation_id).
+    """
+    _fact_cache.invalidate()
+
 
 class MemoryManager:
     """Manages long-term memory storage and retrieval."""
 
     def __init__(self) -> None:
         self.max_context_tokens = 3000  # Rough token estimate for context window
+        self.cache = _fact_cache
 
     async def add_fact(
         self,
@@ -38,6 +130,7 @@ class MemoryManager:
                 (fact, source_conversation_id, min(max(importance, 1), 10)),
             )
             await db.commit()
+            self.cache.invalidate()
             fact_id = cursor.lastrowid
             logger.info("Stored memory fact #%d (importance=%d)", fact_id, importance)
             return fact_id
@@ -58,12 +151,18 @@ class MemoryManager:
         Returns:
             List of matching fact dicts.
         """
+        # Simple keyword search — split query into words, match any
+        words = query.lower().split()
+        if not words:
+            return []
+
+        key = ("search", tuple(words), limit)
         db = await get_db()
         try:
-            # Simple keyword search — split query into words, match any
-            words = query.lower().split()
-            if not words:
-                return []
+            version = await get_data_version(db, "memory")
+            cached = self.cache.get(key, version)
+            if cached is not None:
+                return cached
 
             conditions = " OR ".join(["LOWER(fact) LIKE ?" for _ in words])
             params = [f"%{w}%" for w in words]
@@ -76,7 +175,7 @@ class MemoryManager:
                 params,
             )
 
-            return [
+            facts = [
                 {
                     "id": row[0],
                     "fact": row[1],
@@ -86,8 +185,199 @@ class MemoryManager:
                 }
                 for row in rows
             ]
+            self.cache.put(key, version, facts)
+            return facts
+        finally:
+            await db.close()
+
+    async def delete_fact(self, fact_id: int) -> bool:
+        """Remove a fact from long-term memory.
+
+        Args:
+            fact_id: ID of the fact to delete.
+
+        Returns:
+            True if a fact was deleted.
+        """
+        db = await get_db()
+        try:
+            cursor = await db.execute("DELETE FROM memory WHERE id = ?", (fact_id,))
+            await db.commit()
+            deleted = cursor.rowcount > 0
+            if deleted:
+                self.cache.invalidate()
+                logger.info("Deleted memory fact #%d", fact_id)
+            return deleted
+        finally:
+            await db.close()
+
+    async def import_facts_jsonl(
+        self,
+        chunks: AsyncIterator[bytes],
+        batch_size: int = IMPORT_BATCH_SIZE,
+    ) -> Dict[str, Any]:
+        """Bulk-import facts from a stream of JSONL bytes.
+
+        Each line is an object with a required "fact" and optional "importance",
+        "source_conversation_id" and "created_at" (the format produced by
+        export_facts_jsonl). Lines are parsed as they arrive and written with
+        executemany, one transaction per batch, so memory use stays flat.
+        Every value is checked before it is batched, so a bad line (including
+        one longer than MAX_IMPORT_LINE_BYTES) is rejected and reported
+        without affecting the others. Source conversations that do not exist
+        are stored as NULL.
+
+        Args:
+            chunks: Async iterator of raw request body chunks.
+            batch_size: Rows per transaction.
+
+        Returns:
+            Dict with imported and rejected counts and the first few errors.
+        """
+        imported = 0
+        rejected = 0
+        errors: List[str] = []
+        batch: List[Tuple[Any, ...]] = []
+        line_number = 0
+
+        def reject(message: str) -> None:
+            nonlocal rejected
+            rejected += 1
+            if len(errors) < 20:
+                errors.append(f"line {line_number}: {message}")
+
+        def parse(line: bytes) -> None:
+            line = line.strip()
+            if not line:
+                return
+            try:
+                record = json.loads(line)
+                fact = record["fact"]
+                if not isinstance(fact, str) or not fact.strip():
+                    raise ValueError("fact must be a non-empty string")
+                importance = min(max(int(record.get("importance", 5)), 1), 10)
+                source = record.get("source_conversation_id")
+                created_at = record.get("created_at")
+                if created_at is not None and (
+                    isinstance(created_at, bool)
+                    or not isinstance(created_at, (str, int, float))
+                    or (isinstance(created_at, float) and not math.isfinite(created_at))
+                ):
+                    raise ValueError("created_at must be a string or a finite number")
+                if source is not None:
+                    # int() would truncate 3.7 and attach the fact to conversation 3
+                    if isinstance(source, bool) or (
+                        isinstance(source, float) and not source.is_integer()
+                    ):
+                        raise ValueError(
+                            f"source_conversation_id must be an integer, got {source!r}"
+                        )
+                    source = int(source)
+                for value in (source, created_at):
+                    if isinstance(value, int) and not SQLITE_MIN_INT <= value <= SQLITE_MAX_INT:
+                        raise OverflowError(f"{value} does not fit in a 64-bit integer")
+                # Lone surrogates are valid JSON but cannot be stored as UTF-8
+                fact.encode("utf-8")
+                if isinstance(created_at, str):
+                    created_at.encode("utf-8")
+                batch.append((fact, source, importance, created_at))
+            except (ValueError, TypeError, KeyError, AttributeError, OverflowError) as e:
+                reject(str(e))
+
+        db = await get_db()
+        try:
+            async def flush() -> None:
+                nonlocal imported
+                if not batch:
+                    return
+                await db.executemany(
+                    "INSERT INTO memory (fact, source_conversation_id, importance, created_at) "
+                    "VALUES (?, (SELECT id FROM conversations WHERE id = ?), ?, "
+                    "COALESCE(?, CURRENT_TIMESTAMP))",
+                    batch,
+                )
+                await db.commit()
+                imported += len(batch)
+                batch.clear()
+
+            buffer = b""
+            # Set while discarding the rest of an over-long line
+            oversized = False
+            async for chunk in chunks:
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    line_number += 1
+                    if oversized:
+                        oversized = False
+                        reject(f"exceeds {MAX_IMPORT_LINE_BYTES} bytes")
+                        continue
+                    parse(line)
+                    if len(batch) >= batch_size:
+                        await flush()
+                if len(buffer) > MAX_IMPORT_LINE_BYTES:
+                    oversized = True
+                    buffer = b""
+            if buffer or oversized:
+                line_number += 1
+                if oversized:
+                    reject(f"exceeds {MAX_IMPORT_LINE_BYTES} bytes")
+                else:
+                    parse(buffer)
+            await flush()
         finally:
             await db.close()
+            if imported:
+                self.cache.invalidate()
+
+        logger.info("Imported %d memory facts (%d rejected)", imported, rejected)
+        return {"imported": imported, "rejected": rejected, "errors": errors}
+
+    async def export_facts_jsonl(self, fetch_size: int = EXPORT_FETCH_SIZE) -> AsyncIterator[str]:
+        """Stream every stored fact as JSONL.
+
+        Rows are read from a single cursor in fetch_size pages rather than
+        materialized up front, so memory use stays flat for any table size.
+
+        Args:
+            fetch_size: Rows fetched per round trip; one chunk is yielded per page.
+
+        Yields:
+            Chunks of newline-terminated JSON objects.
+        """
+        db = await get_db()
+        try:
+            cursor = await db.execute(
+                "SELECT id, fact, source_conversation_id, importance, created_at "
+                "FROM memory ORDER BY id"
+            )
+            try:
+                while True:
+                    rows = await cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    yield "".join(
+                        json.dumps({
+                            "id": row[0],
+                            "fact": row[1],
+                            "source_conversation_id": row[2],
+                            "importance": row[3],
+                            "created_at": row[4],
+                        }) + "\n"
+                        for row in rows
+                    )
+            finally:
+                await cursor.close()
+        finally:
+            await db.close()
+
+    def invalidate_cache(self) -> None:
+        """Invalidate cached reads (e.g. after consolidating or rewriting facts)."""
+        self.cache.invalidate()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get fact cache hit-rate statistics."""
+        return self.cache.stats()
 
     async def get_conversation_context(
         self,
@@ -194,14 +484,20 @@ class MemoryManager:
         Returns:
             List of fact dicts.
         """
+        key = ("all", limit, offset)
         db = await get_db()
         try:
+            version = await get_data_version(db, "memory")
+            cached = self.cache.get(key, version)
+            if cached is not None:
+                return cached
+
             rows = await db.execute_fetchall(
                 "SELECT id, fact, source_conversation_id, importance, created_at "
                 "FROM memory ORDER BY importance DESC, created_at DESC LIMIT ? OFFSET ?",
                 (limit, offset),
             )
-            return [
+            facts = [
                 {
                     "id": row[0],
                     "fact": row[1],
@@ -211,5 +507,7 @@ class MemoryManager:
                 }
                 for row in rows
             ]
+            self.cache.put(key, version, facts)
+            return facts
         finally:
             await db.close()
@@ -0,0 +1,126 @@
+"""Non-blocking subprocess execution for tools.
+
+Subprocesses run as asyncio subprocesses in their own session, so a timeout
+or cancellation can kill the whole process group, including anything the
+child started. Output is read as it is produced and capped while reading:
+bytes past the cap are drained and discarded, so a chatty child can neither
+fill memory nor block on a full pipe. A shared semaphore bounds how many
+tool subprocesses run at once.
+"""
+
+import os
+import signal
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from config import SUBPROCESS_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Shared by every tool that starts a subprocess
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def process_slots() -> asyncio.Semaphore:
+    """Semaphore bounding concurrently running tool subprocesses."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(max(1, SUBPROCESS_CONCURRENCY))
+    return _slots
+
+
+class CappedBuffer:
+    """Bytes read from a pipe, up to a limit."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.data = bytearray()
+        self.truncated = False
+
+    async def drain(self, stream: asyncio.StreamReader) -> None:
+        while True:
+            chunk = await stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            room = self.limit - len(self.data)
+            if len(chunk) > room:
+                self.truncated = True
+                chunk = chunk[:max(room, 0)]
+            self.data += chunk
+
+    def text(self) -> str:
+        return self.data.decode("utf-8", errors="replace")
+
+
+def kill_group(process: asyncio.subprocess.Process) -> None:
+    """SIGKILL the process group led by process (it was started in its own session)."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def run_process(
+    cmd: List[str],
+    timeout: float,
+    stdout_limit: int,
+    stderr_limit: int,
+    cwd: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Run a command without blocking the event loop.
+
+    Args:
+        cmd: Program and arguments.
+        timeout: Seconds the command may run before its process group is killed.
+        stdout_limit: Most bytes of stdout kept.
+        stderr_limit: Most bytes of stderr kept.
+        cwd: Working directory.
+        env: Environment of the child (inherits ours when None).
+
+    Returns:
+        Dict with stdout, stderr (output up to the limits, also on timeout),
+        return_code, timed_out and truncated.
+
+    Raises:
+        FileNotFoundError: If the program does not exist.
+    """
+    async with process_slots():
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            start_new_session=True,
+        )
+        stdout = CappedBuffer(stdout_limit)
+        stderr = CappedBuffer(stderr_limit)
+
+        async def communicate() -> None:
+            await asyncio.gather(stdout.drain(process.stdout), stderr.drain(process.stderr))
+            await process.wait()
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(communicate(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            logger.warning("Killing %s after %ss timeout", cmd[0], timeout)
+        finally:
+            # Also reaps children left behind by a process that exited normally
+            kill_group(process)
+            if process.returncode is None:
+                await process.wait()
+
+    return {
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+        "return_code": process.returncode,
+        "timed_out": timed_out,
+        "truncated": stdout.truncated or stderr.truncated,
+    }
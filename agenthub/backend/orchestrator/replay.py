@@ -0,0 +1,71 @@
+"""Bounded per-conversation event history for resuming dropped WebSocket clients."""
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+from config import REPLAY_BUFFER_SIZE, REPLAY_MAX_CONVERSATIONS
+
+
+class _ConversationRing:
+    """Ring buffer of one conversation's events."""
+
+    __slots__ = ("events", "dropped_upto")
+
+    def __init__(self, size: int) -> None:
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=size)
+        # Highest sequence number that has fallen out of the ring
+        self.dropped_upto = 0
+
+
+class ReplayBuffer:
+    """Keeps the most recent sequenced events of each active conversation.
+
+    Each conversation holds at most ``size`` events, and at most
+    ``max_conversations`` conversations are kept (least recently active are
+    evicted first). Replays report a gap whenever events after the client's
+    last sequence number may have been evicted, so the client knows to refetch
+    the conversation over REST instead.
+    """
+
+    def __init__(
+        self,
+        size: int = REPLAY_BUFFER_SIZE,
+        max_conversations: int = REPLAY_MAX_CONVERSATIONS,
+    ) -> None:
+        self.size = size
+        self.max_conversations = max_conversations
+        self._rings: "OrderedDict[Any, _ConversationRing]" = OrderedDict()
+        # Highest sequence number of any conversation evicted as a whole
+        self._evicted_upto = 0
+
+    def record(self, conversation_id: Any, message: Dict[str, Any]) -> None:
+        """Remember a sequenced event for a conversation."""
+        if self.size <= 0:
+            return
+        ring = self._rings.get(conversation_id)
+        if ring is None:
+            ring = self._rings[conversation_id] = _ConversationRing(self.size)
+            while len(self._rings) > self.max_conversations:
+                _, evicted = self._rings.popitem(last=False)
+                if evicted.events:
+                    self._evicted_upto = max(self._evicted_upto, evicted.events[-1]["seq"])
+            # The conversation may have had events in a ring evicted earlier
+            ring.dropped_upto = self._evicted_upto
+        else:
+            self._rings.move_to_end(conversation_id)
+        if len(ring.events) == ring.events.maxlen:
+            ring.dropped_upto = ring.events[0]["seq"]
+        ring.events.append(message)
+
+    def since(self, conversation_id: Any, last_seq: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Get a conversation's events with seq greater than last_seq.
+
+        Returns:
+            Tuple of (events in order, gap). gap is True if some events after
+            last_seq are no longer buffered.
+        """
+        ring = self._rings.get(conversation_id)
+        if ring is None:
+            return [], last_seq < self._evicted_upto
+        events = [e for e in ring.events if e["seq"] > last_seq]
+        return events, last_seq < ring.dropped_upto
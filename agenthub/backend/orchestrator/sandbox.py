@@ -0,0 +1,348 @@
+"""Pool of warm Python sandbox workers for execute_code.
+
+Starting ``python3 -c`` per run pays interpreter startup and, for most data
+work, the import of numpy/pandas on every call. The pool keeps a few worker
+processes (see orchestrator.sandbox_worker) that were started with the same
+workspace cwd and restricted environment as the cold path and have already
+imported SANDBOX_PRELOAD. A worker never runs code itself: it forks a fresh
+child per run, so nothing one run changes is seen by the next. Each run gets
+its own stdout/stderr pipes, passed to the worker over a Unix socket.
+
+A worker is retired and replaced in the background after SANDBOX_MAX_RUNS
+runs, on timeout or cancellation (the run's and the worker's process groups
+are killed) and when it dies. When no warm worker is idle, run() returns None
+and the caller uses the cold path.
+"""
+
+import os
+import json
+import signal
+import socket
+import struct
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from config import SANDBOX_MAX_RUNS, SANDBOX_POOL_SIZE, SANDBOX_PRELOAD
+from orchestrator.processes import CappedBuffer, kill_group, process_slots
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+HEADER = struct.Struct("!I")
+# Preloading heavy libraries can take a while on a cold disk
+READY_TIMEOUT = 60.0
+
+
+def _kill_run(pid: int) -> None:
+    """SIGKILL the process group of a run's child (it leads its own group)."""
+    if pid > 0:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class SandboxWorker:
+    """One warm worker process and its control socket."""
+
+    def __init__(self, process: asyncio.subprocess.Process, sock: socket.socket) -> None:
+        self.process = process
+        self.sock = sock
+        self.runs = 0
+        # Modules from the preload list that could not be imported
+        self.preload_failed: List[str] = []
+
+    @classmethod
+    async def start(cls, cwd: str, env: Dict[str, str], preload: List[str]) -> "SandboxWorker":
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "python3",
+                WORKER_SCRIPT,
+                str(child_sock.fileno()),
+                ",".join(preload),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                cwd=cwd,
+                env=env,
+                pass_fds=(child_sock.fileno(),),
+                start_new_session=True,
+            )
+        except BaseException:
+            parent_sock.close()
+            raise
+        finally:
+            child_sock.close()
+        parent_sock.setblocking(False)
+        worker = cls(process, parent_sock)
+        try:
+            ready = await asyncio.wait_for(worker._receive(), READY_TIMEOUT)
+        except BaseException:
+            # Also when the pool stops while this worker is warming up
+            worker.close()
+            await worker.process.wait()
+            raise
+        worker.preload_failed = ready.get("failed", [])
+        return worker
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def _receive(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        header = await self._recv_exact(loop, HEADER.size)
+        return json.loads(await self._recv_exact(loop, HEADER.unpack(header)[0]))
+
+    async def _recv_exact(self, loop: asyncio.AbstractEventLoop, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = await loop.sock_recv(self.sock, size - len(data))
+            if not chunk:
+                raise EOFError("Sandbox worker exited")
+            data += chunk
+        return data
+
+    async def run(
+        self,
+        code: str,
+        timeout: float,
+        stdout_limit: int,
+        stderr_limit: int,
+    ) -> Dict[str, Any]:
+        """Run code in a child of this worker; same result shape as run_process plus ``crashed``.
+
+        The worker must be discarded afterwards if the result is timed_out or
+        crashed, or if this raises. Raises OSError only when the job could not
+        be handed over, i.e. the code did not run.
+        """
+        loop = asyncio.get_running_loop()
+        self.runs += 1
+        stdout = CappedBuffer(stdout_limit)
+        stderr = CappedBuffer(stderr_limit)
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        transports = []
+        try:
+            readers = []
+            for fd in (out_r, err_r):
+                reader = asyncio.StreamReader()
+                transport, _ = await loop.connect_read_pipe(
+                    lambda reader=reader: asyncio.StreamReaderProtocol(reader),
+                    os.fdopen(fd, "rb", buffering=0),
+                )
+                transports.append(transport)
+                readers.append(reader)
+
+            payload = json.dumps({"code": code}).encode("utf-8")
+            # The header is tiny, so sending it with the pipes never blocks
+            socket.send_fds(self.sock, [HEADER.pack(len(payload))], [out_w, err_w])
+            os.close(out_w)
+            os.close(err_w)
+            out_w = err_w = -1
+            await loop.sock_sendall(self.sock, payload)
+
+            reply: Dict[str, Any] = {}
+            child_pid = 0
+
+            async def communicate() -> None:
+                nonlocal reply, child_pid
+                child_pid = (await self._receive())["pid"]
+                # The pipes reach EOF once the run is over (or the worker died)
+                await asyncio.gather(stdout.drain(readers[0]), stderr.drain(readers[1]))
+                reply = await self._receive()
+
+            timed_out = False
+            try:
+                await asyncio.wait_for(communicate(), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                logger.warning("Killing sandbox worker after %ss timeout", timeout)
+                _kill_run(child_pid)
+                self.close()
+            except EOFError:
+                # The code killed the worker process
+                await self.process.wait()
+                reply = {"return_code": self.process.returncode, "crashed": True}
+            except OSError as e:
+                # The job was handed over, so the code may have run: never retry it
+                logger.warning("Lost sandbox worker connection during a run: %s", e)
+                _kill_run(child_pid)
+                self.close()
+                await self.process.wait()
+                reply = {"return_code": self.process.returncode, "crashed": True}
+        finally:
+            if "return_code" not in reply or reply.get("crashed"):
+                # Timed out, cancelled or orphaned: the run's group outlives the worker
+                _kill_run(child_pid)
+            for fd in (out_w, err_w):
+                if fd != -1:
+                    os.close(fd)
+            for transport in transports:
+                transport.close()
+
+        return {
+            "stdout": stdout.text(),
+            "stderr": stderr.text(),
+            "return_code": -1 if timed_out else reply.get("return_code"),
+            "timed_out": timed_out,
+            "truncated": stdout.truncated or stderr.truncated,
+            "crashed": reply.get("crashed", False),
+        }
+
+    def close(self) -> None:
+        """Kill the worker's process group and close its socket."""
+        kill_group(self.process)
+        self.sock.close()
+
+
+class SandboxPool:
+    """Warm sandbox workers, recycled after max_runs runs, a timeout or a crash."""
+
+    def __init__(
+        self,
+        cwd: str,
+        env: Dict[str, str],
+        size: int = SANDBOX_POOL_SIZE,
+        max_runs: int = SANDBOX_MAX_RUNS,
+        preload: Optional[List[str]] = None,
+    ) -> None:
+        self.cwd = cwd
+        self.env = env
+        self.size = size
+        self.max_runs = max(1, max_runs)
+        self.preload = preload if preload is not None else [
+            name.strip() for name in SANDBOX_PRELOAD.split(",") if name.strip()
+        ]
+        self._idle: List[SandboxWorker] = []
+        self._starting: Set[asyncio.Task] = set()
+        self._busy: Set[SandboxWorker] = set()
+        self._closed = True
+        self._warned_preload = False
+
+        # Metrics
+        self.warm_runs = 0
+        self.cold_runs = 0
+        self.recycled = 0
+        self.crashes = 0
+        self.timeouts = 0
+        self.start_failures = 0
+
+    def start(self) -> None:
+        """Begin warming workers in the background."""
+        self._closed = False
+        self._replenish()
+
+    async def stop(self) -> None:
+        """Kill all workers."""
+        self._closed = True
+        for task in list(self._starting):
+            task.cancel()
+        await asyncio.gather(*self._starting, return_exceptions=True)
+        for worker in self._idle + list(self._busy):
+            worker.close()
+            await worker.process.wait()
+        self._idle.clear()
+        self._busy.clear()
+
+    def _replenish(self) -> None:
+        missing = self.size - len(self._idle) - len(self._busy) - len(self._starting)
+        for _ in range(max(0, missing)):
+            task = asyncio.create_task(self._spawn())
+            self._starting.add(task)
+            task.add_done_callback(self._starting.discard)
+
+    async def _spawn(self) -> None:
+        try:
+            worker = await SandboxWorker.start(self.cwd, self.env, self.preload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.start_failures += 1
+            logger.warning("Could not start sandbox worker: %s", e)
+            return
+        if worker.preload_failed and not self._warned_preload:
+            self._warned_preload = True
+            logger.info("Sandbox could not preload: %s", ", ".join(worker.preload_failed))
+        if self._closed:
+            worker.close()
+            await worker.process.wait()
+            return
+        self._idle.append(worker)
+
+    def _take(self) -> Optional[SandboxWorker]:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+            worker.close()
+            self._replenish()
+        return None
+
+    async def _retire(self, worker: SandboxWorker) -> None:
+        self.recycled += 1
+        worker.close()
+        await worker.process.wait()
+        if not self._closed:
+            self._replenish()
+
+    async def run(
+        self,
+        code: str,
+        timeout: float,
+        stdout_limit: int,
+        stderr_limit: int,
+    ) -> Optional[Dict[str, Any]]:
+        """Run code in a warm worker.
+
+        Returns:
+            The run_process-style result, or None when no warm worker is idle
+            (the caller should then start a cold process).
+        """
+        if self._closed or self.size <= 0:
+            return None
+        async with process_slots():
+            worker = self._take()
+            if worker is None:
+                self.cold_runs += 1
+                return None
+            self._busy.add(worker)
+            keep = False
+            try:
+                try:
+                    result = await worker.run(code, timeout, stdout_limit, stderr_limit)
+                except OSError as e:
+                    # The job could not be handed over, so the code did not run
+                    logger.warning("Sandbox worker failed, running cold: %s", e)
+                    self.cold_runs += 1
+                    return None
+                self.warm_runs += 1
+                self.timeouts += result["timed_out"]
+                self.crashes += result["crashed"]
+                keep = not (result["timed_out"] or result["crashed"]) and worker.runs < self.max_runs
+            finally:
+                self._busy.discard(worker)
+                if keep and not self._closed:
+                    self._idle.append(worker)
+                else:
+                    await self._retire(worker)
+        result.pop("crashed")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "busy": len(self._busy),
+            "starting": len(self._starting),
+            "max_runs": self.max_runs,
+            "preload": self.preload,
+            "warm_runs": self.warm_runs,
+            "cold_runs": self.cold_runs,
+            "recycled": self.recycled,
+            "crashes": self.crashes,
+            "timeouts": self.timeouts,
+            "start_failures": self.start_failures,
+        }
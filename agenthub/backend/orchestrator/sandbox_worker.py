@@ -0,0 +1,161 @@
+"""Warm sandbox worker (zygote) for execute_code.
+
+Run as a script (never imported by the backend) with the restricted
+environment and workspace cwd of execute_code:
+
+    python3 sandbox_worker.py <socket fd> <comma-separated modules to preload>
+
+It preloads the modules, reports ``{"ready": ...}`` and then handles one job
+at a time. Messages on the Unix socket are 4-byte big-endian length prefixed
+JSON. A job ``{"code": ...}`` arrives together with two file descriptors
+(stdout and stderr pipes for this run, via SCM_RIGHTS).
+
+User code never runs in this process: each job is run in a freshly forked
+child, in its own process group, which sees the preloaded modules but whose
+changes (module attributes, sys.modules, umask, cwd, environment, threads,
+...) die with it. The worker reports ``{"pid": ...}`` once the child is
+started, waits for it to exit, kills whatever the child left running in its
+process group and then replies ``{"return_code": ...}``. The child has no
+access to the socket, so it cannot forge the reply.
+"""
+
+import atexit
+import builtins
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+import traceback
+from typing import Any, Dict, List
+
+HEADER = struct.Struct("!I")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def _send(sock: socket.socket, message: Dict[str, Any]) -> None:
+    payload = json.dumps(message).encode("utf-8")
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def _exit_code(exc: SystemExit) -> int:
+    """Exit status of a SystemExit, as the interpreter would report it."""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code & 0xFF
+    print(exc.code, file=sys.stderr)
+    return 1
+
+
+def _run(code: str) -> int:
+    """Run code like ``python3 -c`` would, including interpreter shutdown."""
+    sys.argv = ["-c"]
+    namespace = {"__name__": "__main__", "__builtins__": builtins}
+    try:
+        exec(compile(code, "<string>", "exec"), namespace)
+        return_code = 0
+    except SystemExit as exc:
+        return_code = _exit_code(exc)
+    except BaseException as exc:
+        # Skip this function's frame, so the traceback looks like python3 -c
+        traceback.print_exception(type(exc), exc, exc.__traceback__.tb_next)
+        return_code = 1
+    # The interpreter waits for non-daemon threads, then runs atexit handlers
+    for thread in threading.enumerate():
+        if thread is not threading.main_thread() and not thread.daemon:
+            thread.join()
+    atexit._run_exitfuncs()
+    return return_code
+
+
+def _child(sock: socket.socket, code: str, out_fd: int, err_fd: int) -> None:
+    """Body of the forked child; never returns."""
+    return_code = 1
+    try:
+        os.setpgid(0, 0)
+        sock.close()
+        os.dup2(out_fd, 1)
+        os.dup2(err_fd, 2)
+        os.close(out_fd)
+        os.close(err_fd)
+        return_code = _run(code)
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except (OSError, ValueError, AttributeError):
+                pass
+        os._exit(return_code)
+
+
+def _run_job(sock: socket.socket, code: str, out_fd: int, err_fd: int) -> int:
+    """Run code in a forked child and return its exit status."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        _child(sock, code, out_fd, err_fd)
+    # Only the child keeps the pipes open, so the parent sees EOF when it is done
+    os.close(out_fd)
+    os.close(err_fd)
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        # The child already did it (or has exited)
+        pass
+    _send(sock, {"pid": pid})
+    # Wait without reaping: the zombie keeps the process group id from being reused
+    os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def main() -> None:
+    sock = socket.socket(fileno=int(sys.argv[1]))
+    loaded: List[str] = []
+    failed: List[str] = []
+    for name in filter(None, sys.argv[2].split(",") if len(sys.argv) > 2 else []):
+        try:
+            __import__(name)
+            loaded.append(name)
+        except Exception:
+            failed.append(name)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+    _send(sock, {"ready": True, "loaded": loaded, "failed": failed})
+
+    while True:
+        try:
+            header, fds, _, _ = socket.recv_fds(sock, HEADER.size, 2)
+        except OSError:
+            return
+        if not header:
+            return
+        header += _recv_exact(sock, HEADER.size - len(header))
+        job = json.loads(_recv_exact(sock, HEADER.unpack(header)[0]))
+        if len(fds) != 2:
+            return
+        return_code = _run_job(sock, job["code"], fds[0], fds[1])
+        _send(sock, {"return_code": return_code})
+
+
+if __name__ == "__main__":
+    main()
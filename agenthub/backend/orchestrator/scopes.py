@@ -0,0 +1,70 @@
+"""Cancellation scopes and deadlines for top-level tasks.
+
+A top-level task and every delegation it starts run inside one asyncio task,
+so one scope covers the whole tree: cancelling it (or reaching its deadline)
+cancels that asyncio task, which unwinds the delegations and closes the
+in-flight Anthropic stream. The scope remembers why it was cancelled so the
+tasks can be recorded as 'cancelled' or 'timed_out'.
+"""
+
+import asyncio
+from typing import Optional
+
+from config import TASK_TIMEOUT
+
+
+def effective_timeout(requested: Optional[float]) -> Optional[float]:
+    """Apply the TASK_TIMEOUT ceiling to a requested timeout.
+
+    Returns:
+        Seconds the task may run, or None for no deadline.
+    """
+    if TASK_TIMEOUT > 0:
+        return min(requested, TASK_TIMEOUT) if requested else TASK_TIMEOUT
+    return requested or None
+
+
+class TaskScope:
+    """Deadline and cancellation handle for one top-level task and its delegations."""
+
+    def __init__(self, task_id: int, timeout: Optional[float] = None) -> None:
+        """Open a scope for the current asyncio task and arm its deadline.
+
+        Args:
+            task_id: The top-level task this scope belongs to.
+            timeout: Seconds the task may run; None or 0 for no deadline.
+        """
+        loop = asyncio.get_running_loop()
+        self.task_id = task_id
+        self.timeout = timeout or None
+        self.task = asyncio.current_task()
+        self.deadline: Optional[float] = loop.time() + self.timeout if self.timeout else None
+        # 'cancelled' or 'timed_out' once the scope has been cancelled
+        self.reason: Optional[str] = None
+        self._timer: Optional[asyncio.TimerHandle] = (
+            loop.call_at(self.deadline, self.cancel, "timed_out") if self.deadline else None
+        )
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancel the task tree.
+
+        Returns:
+            False if the scope was already cancelled or its task has finished.
+        """
+        if self.reason is not None or self.task is None or self.task.done():
+            return False
+        self.reason = reason
+        self.task.cancel()
+        return True
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - asyncio.get_running_loop().time())
+
+    def close(self) -> None:
+        """Disarm the deadline once the task has finished."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,156 @@
+"""In-memory settings store backed by the settings table.
+
+Settings are loaded once at startup and served from memory. Writes go to
+SQLite in a single transaction, then the in-memory copy is swapped and
+subscribers are told which runtime settings changed. Other worker processes
+reload when the settings_updated event reaches them over the event bus.
+
+Keys listed in SETTING_TYPES are runtime settings with a type and a default
+from the environment; any other key is stored and returned as plain text.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+from config import ADVANCED_MODEL, DEFAULT_MODEL, MAX_TOKENS
+from db.database import get_data_version, get_db
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[Dict[str, Any]], None]
+
+# Runtime settings: key -> (type, default)
+SETTING_TYPES: Dict[str, Tuple[type, Any]] = {
+    "default_model": (str, DEFAULT_MODEL),
+    "advanced_model": (str, ADVANCED_MODEL),
+    "max_tokens": (int, MAX_TOKENS),
+}
+
+
+def _convert(key: str, raw: str) -> Any:
+    """Convert a stored string to the type of a runtime setting.
+
+    Raises:
+        ValueError: If the value is not valid for the setting.
+    """
+    kind, _ = SETTING_TYPES[key]
+    if kind is int:
+        value = int(raw)
+        if value <= 0:
+            raise ValueError(f"Setting '{key}' must be a positive integer")
+        return value
+    value = kind(raw).strip()
+    if not value:
+        raise ValueError(f"Setting '{key}' must not be empty")
+    return value
+
+
+class SettingsStore:
+    """Typed, in-memory view of the settings table with change notifications."""
+
+    def __init__(self) -> None:
+        self._raw: Dict[str, str] = {}
+        self._values: Dict[str, Any] = {key: default for key, (_, default) in SETTING_TYPES.items()}
+        self._subscribers: List[Subscriber] = []
+        self._lock = asyncio.Lock()
+        # data_versions counter the in-memory copy was loaded at (used for ETags)
+        self.version = 0
+
+    def get(self, key: str) -> Any:
+        """Get a runtime setting (typed) or any other stored setting (text)."""
+        if key in self._values:
+            return self._values[key]
+        return self._raw.get(key)
+
+    def all(self) -> Dict[str, str]:
+        """Get every stored setting as text."""
+        return dict(self._raw)
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Call callback with {key: new value} whenever runtime settings change.
+
+        Returns:
+            Function that removes the subscription.
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    async def load(self, at_least: int = 0) -> None:
+        """(Re)load all settings from the database.
+
+        Loads and updates run one at a time, and an older snapshot never
+        replaces a newer one.
+
+        Args:
+            at_least: Skip the reload if the in-memory copy is already at this
+                data version (a queued reload made it unnecessary).
+        """
+        async with self._lock:
+            if at_least and self.version >= at_least:
+                return
+            db = await get_db()
+            try:
+                version = await get_data_version(db, "settings")
+                rows = await db.execute_fetchall("SELECT key, value FROM settings")
+            finally:
+                await db.close()
+            if version >= self.version:
+                self._swap({row[0]: row[1] for row in rows}, version)
+
+    async def update(self, changes: Dict[str, str]) -> List[str]:
+        """Upsert settings in one transaction and apply them in memory.
+
+        Returns:
+            The keys whose stored value changed.
+
+        Raises:
+            ValueError: If a runtime setting gets an invalid value; nothing is written.
+        """
+        for key, raw in changes.items():
+            if key in SETTING_TYPES:
+                _convert(key, raw)
+
+        async with self._lock:
+            changed = [key for key, raw in changes.items() if self._raw.get(key) != raw]
+            if not changed:
+                return []
+            db = await get_db()
+            try:
+                await db.executemany(
+                    "INSERT INTO settings (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    [(key, changes[key]) for key in changed],
+                )
+                # Read inside the write transaction, so the version matches
+                # exactly these rows even if another process writes next
+                version = await get_data_version(db, "settings")
+                await db.commit()
+            finally:
+                await db.close()
+            self._swap({**self._raw, **{key: changes[key] for key in changed}}, version)
+        return changed
+
+    def _swap(self, raw: Dict[str, str], version: int) -> None:
+        """Replace the in-memory settings and notify subscribers of typed changes."""
+        values = {}
+        for key, (_, default) in SETTING_TYPES.items():
+            try:
+                values[key] = _convert(key, raw[key]) if key in raw else default
+            except ValueError:
+                logger.warning("Ignoring invalid stored value for setting '%s'", key)
+                values[key] = default
+
+        changed = {key: value for key, value in values.items() if self._values.get(key) != value}
+        self._raw, self._values, self.version = raw, values, version
+        if not changed:
+            return
+        logger.info("Runtime settings changed: %s", ", ".join(sorted(changed)))
+        for callback in list(self._subscribers):
+            try:
+                callback(changed)
+            except Exception:
+                logger.exception("Settings subscriber failed")
+
+
+settings = SettingsStore()
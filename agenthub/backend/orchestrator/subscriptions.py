@@ -0,0 +1,129 @@
+"""Topic subscriptions for routing broadcast events to interested WebSocket clients."""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Filter dimensions, in the order they appear in subscribe/unsubscribe payloads
+DIMENSIONS = ("conversation_id", "task_tree", "event_type")
+
+
+class SubscriptionIndex:
+    """Index of per-client event filters.
+
+    A client's filter constrains up to three dimensions: conversation ids, task
+    trees (identified by their root task id) and event types. An event matches
+    when it matches every constrained dimension, and any listed value matches
+    within a dimension. Clients that never subscribed receive everything, which
+    keeps a plain /ws connection behaving as before. Events that carry no value
+    for a dimension (e.g. status_update has no conversation) are not filtered
+    on it.
+    """
+
+    def __init__(self) -> None:
+        self._firehose: Set[Any] = set()
+        self._filters: Dict[Any, Dict[str, Set[Any]]] = {}
+        self._index: Dict[str, Dict[Any, Set[Any]]] = {d: {} for d in DIMENSIONS}
+        self._wildcard: Dict[str, Set[Any]] = {d: set() for d in DIMENSIONS}
+
+    def add(self, client: Any) -> None:
+        """Register a client that receives all events until it subscribes."""
+        self._firehose.add(client)
+
+    def remove(self, client: Any) -> None:
+        """Forget a client and all of its subscriptions."""
+        self._firehose.discard(client)
+        self._drop_filter(client)
+
+    def subscribe(
+        self,
+        client: Any,
+        conversation_ids: Iterable[Any] = (),
+        task_ids: Iterable[Any] = (),
+        event_types: Iterable[str] = (),
+    ) -> Dict[str, List[Any]]:
+        """Narrow a client's stream to the given topics (added to any existing ones).
+
+        Returns:
+            The client's resulting filter.
+        """
+        additions = dict(zip(DIMENSIONS, (set(conversation_ids), set(task_ids), set(event_types))))
+        current = self._filters.get(client, {d: set() for d in DIMENSIONS})
+        self._set_filter(client, {d: current[d] | additions[d] for d in DIMENSIONS})
+        return self.get_filter(client)
+
+    def unsubscribe(
+        self,
+        client: Any,
+        conversation_ids: Iterable[Any] = (),
+        task_ids: Iterable[Any] = (),
+        event_types: Iterable[str] = (),
+    ) -> Dict[str, List[Any]]:
+        """Remove topics from a client's filter.
+
+        A client whose filter becomes empty goes back to receiving everything.
+        Calling this with no topics at all clears the filter.
+
+        Returns:
+            The client's resulting filter.
+        """
+        removals = dict(zip(DIMENSIONS, (set(conversation_ids), set(task_ids), set(event_types))))
+        current = self._filters.get(client)
+        if current is not None:
+            if any(removals.values()):
+                self._set_filter(client, {d: current[d] - removals[d] for d in DIMENSIONS})
+            else:
+                self._set_filter(client, {d: set() for d in DIMENSIONS})
+        return self.get_filter(client)
+
+    def get_filter(self, client: Any) -> Dict[str, List[Any]]:
+        """Get a client's filter; empty lists mean unconstrained."""
+        current = self._filters.get(client, {})
+        return {d: sorted(current.get(d, ()), key=str) for d in DIMENSIONS}
+
+    def recipients(
+        self,
+        event_type: str,
+        conversation_id: Optional[Any] = None,
+        task_tree: Optional[Any] = None,
+    ) -> Set[Any]:
+        """Get every client interested in an event."""
+        values = dict(zip(DIMENSIONS, (conversation_id, task_tree, event_type)))
+        matched: Optional[Set[Any]] = None
+        for dimension, value in values.items():
+            if value is None:
+                continue
+            candidates = self._index[dimension].get(value, set()) | self._wildcard[dimension]
+            matched = candidates if matched is None else matched & candidates
+            if not matched:
+                break
+        if matched is None:
+            matched = set(self._filters)
+        return self._firehose | matched
+
+    def _set_filter(self, client: Any, new_filter: Dict[str, Set[Any]]) -> None:
+        self._drop_filter(client)
+        if not any(new_filter.values()):
+            self._firehose.add(client)
+            return
+        self._firehose.discard(client)
+        self._filters[client] = new_filter
+        for dimension, values in new_filter.items():
+            if not values:
+                self._wildcard[dimension].add(client)
+            for value in values:
+                self._index[dimension].setdefault(value, set()).add(client)
+
+    def _drop_filter(self, client: Any) -> None:
+        old = self._filters.pop(client, None)
+        if old is None:
+            return
+        for dimension, values in old.items():
+            self._wildcard[dimension].discard(client)
+            for value in values:
+                clients = self._index[dimension].get(value)
+                if clients is not None:
+                    clients.discard(client)
+                    if not clients:
+                        del self._index[dimension][value]
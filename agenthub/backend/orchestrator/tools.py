@@ -1,20 +1,52 @@
-"""Tool executor for agent capabilities — web search, code execution, file I/O."""
+"""Tool executor for agent capabilities — web search, code execution, file I/O.
+
+Every public coroutine method of ToolExecutor (other than run and stop) is a tool. Its Anthropic tool
+schema is generated from the signature and Google-style docstring, so adding
+a method with a documented ``Args:`` section is all it takes to expose a new
+tool to agents that list it.
+"""
 
 import os
 import re
-import subprocess
+import json
+import time
+import inspect
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
 
 import httpx
 
-from config import WORKSPACE_PATH
+from config import HTTP_CACHE_SEARCH_TTL, WORKSPACE_PATH
+from orchestrator.http_cache import HTTPCache
+from orchestrator.http_client import SharedHTTPClient
+from orchestrator.processes import run_process
+from orchestrator.sandbox import SandboxPool
+from orchestrator.wire import JSON_CODEC
 
 logger = logging.getLogger(__name__)
 
 # Path traversal prevention
 ALLOWED_ROOT = os.path.abspath(WORKSPACE_PATH)
 
+# Subprocess limits (output caps are in bytes and enforced while reading)
+CODE_TIMEOUT = 30
+CODE_STDOUT_LIMIT = 10_000
+CODE_STDERR_LIMIT = 5_000
+SEARCH_TIMEOUT = 15
+SEARCH_OUTPUT_LIMIT = 1_000_000
+
+# Coroutine methods of ToolExecutor that are not tools
+_NOT_TOOLS = ("run", "stop")
+
+
+def _sandbox_env() -> Dict[str, str]:
+    """The restricted environment executed code runs with."""
+    return {
+        "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+        "HOME": ALLOWED_ROOT,
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+
 
 def _sanitize_path(path: str) -> str:
     """Resolve and validate a file path to prevent directory traversal.
@@ -45,11 +77,172 @@ def _sanitize_path(path: str) -> str:
     return resolved
 
 
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+
+def _json_type(annotation: Any) -> Dict[str, Any]:
+    """JSON schema for a parameter annotation (Optional[...] is unwrapped)."""
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        annotation = args[0] if len(args) == 1 else Any
+    origin = get_origin(annotation) or annotation
+    if origin in _JSON_TYPES:
+        return {"type": _JSON_TYPES[origin]}
+    if origin in (dict, Dict):
+        return {"type": "object"}
+    if origin in (list, List):
+        return {"type": "array"}
+    return {}
+
+
+def _parse_docstring(doc: str) -> Tuple[str, Dict[str, str]]:
+    """Split a Google-style docstring into its summary and Args descriptions."""
+    summary, _, rest = inspect.cleandoc(doc or "").partition("\n\n")
+    params: Dict[str, str] = {}
+    section = None
+    current = None
+    for line in rest.splitlines():
+        stripped = line.strip()
+        if not line.startswith(" ") and stripped.endswith(":"):
+            section = stripped[:-1]
+            continue
+        if section != "Args" or not stripped:
+            continue
+        match = re.match(r"(\w+)(?: \([^)]*\))?:\s*(.*)", stripped)
+        if match and line.startswith("    ") and not line.startswith("     "):
+            current = match.group(1)
+            params[current] = match.group(2)
+        elif current:
+            params[current] += " " + stripped
+    return " ".join(summary.split()), params
+
+
+def tool_schema(method: Any) -> Dict[str, Any]:
+    """Build an Anthropic tool definition from a ToolExecutor method."""
+    summary, descriptions = _parse_docstring(method.__doc__)
+    hints = get_type_hints(method)
+    properties: Dict[str, Any] = {}
+    required: List[str] = []
+    for name, param in inspect.signature(method).parameters.items():
+        if name == "self":
+            continue
+        prop = _json_type(hints.get(name, Any))
+        if name in descriptions:
+            prop["description"] = descriptions[name]
+        if param.default is inspect.Parameter.empty:
+            required.append(name)
+        elif param.default is not None:
+            prop["default"] = param.default
+        properties[name] = prop
+    return {
+        "name": method.__name__,
+        "description": summary,
+        "input_schema": {"type": "object", "properties": properties, "required": required},
+    }
+
+
 class ToolExecutor:
-    """Executes tools on behalf of agents."""
+    """Executes tools on behalf of agents and records per-tool call metrics."""
 
     def __init__(self) -> None:
-        os.makedirs(ALLOWED_ROOT, exist_ok=True)
+        try:
+            os.makedirs(ALLOWED_ROOT, exist_ok=True)
+        except OSError as e:
+            # File tools report errors per call; the other tools still work
+            logger.warning("Cannot create workspace %s: %s", ALLOWED_ROOT, e)
+        self._schemas: Dict[str, Dict[str, Any]] = {
+            name: tool_schema(method)
+            for name, method in inspect.getmembers(self, inspect.iscoroutinefunction)
+            if not name.startswith("_") and name not in _NOT_TOOLS
+        }
+        self._stats: Dict[str, Dict[str, float]] = {}
+        # Warm interpreters for execute_code
+        self.sandbox = SandboxPool(ALLOWED_ROOT, _sandbox_env())
+        # Keep-alive connections shared by the web tools
+        self.http = SharedHTTPClient()
+        # Responses kept on disk across conversations
+        self.http_cache = HTTPCache(self.http)
+
+    def start(self) -> None:
+        """Start background resources (warming the sandbox pool)."""
+        self.sandbox.start()
+
+    async def stop(self) -> None:
+        """Release background resources (sandbox workers, HTTP connections and cache)."""
+        await self.sandbox.stop()
+        await self.http.close()
+        await self.http_cache.close()
+
+    @property
+    def names(self) -> List[str]:
+        """Names of all available tools."""
+        return list(self._schemas)
+
+    def schemas(self, names: List[str]) -> List[Dict[str, Any]]:
+        """Tool definitions for the given tool names; unknown names are skipped."""
+        return [self._schemas[name] for name in names if name in self._schemas]
+
+    async def run(self, name: str, arguments: Dict[str, Any]) -> Tuple[str, bool]:
+        """Run one tool call and record its latency and result size.
+
+        Args:
+            name: Tool name.
+            arguments: Tool input as sent by the model.
+
+        Returns:
+            Tuple of the JSON-encoded result and whether it is an error.
+        """
+        started = time.perf_counter()
+        if name not in self._schemas:
+            result: Dict[str, Any] = {"error": f"Unknown tool: {name}"}
+        else:
+            method = getattr(self, name)
+            try:
+                inspect.signature(method).bind(**arguments)
+            except TypeError as e:
+                # Missing or unexpected arguments from the model
+                result = {"error": f"Invalid arguments for {name}: {e}"}
+            else:
+                try:
+                    result = await method(**arguments)
+                except Exception as e:
+                    logger.exception("Tool %s failed", name)
+                    result = {"error": str(e)}
+        content = JSON_CODEC.encode(result)
+        is_error = "error" in result
+        self._record(name, time.perf_counter() - started, len(content), is_error)
+        return content, is_error
+
+    def _record(self, name: str, elapsed: float, size: int, is_error: bool) -> None:
+        stats = self._stats.setdefault(name, {
+            "calls": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0,
+            "total_bytes": 0, "max_bytes": 0,
+        })
+        stats["calls"] += 1
+        stats["errors"] += is_error
+        stats["total_time"] += elapsed
+        stats["max_time"] = max(stats["max_time"], elapsed)
+        stats["total_bytes"] += size
+        stats["max_bytes"] = max(stats["max_bytes"], size)
+        logger.debug("Tool %s took %.1fms, %d bytes", name, elapsed * 1000, size)
+
+    def stats(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Call metrics per tool (all tools that were called, or the given names)."""
+        result: Dict[str, Dict[str, Any]] = {}
+        for name in names if names is not None else list(self._stats):
+            stats = self._stats.get(name)
+            if stats is None:
+                continue
+            calls = stats["calls"]
+            result[name] = {
+                "calls": calls,
+                "errors": stats["errors"],
+                "avg_latency_ms": round(stats["total_time"] / calls * 1000, 1),
+                "max_latency_ms": round(stats["max_time"] * 1000, 1),
+                "avg_result_bytes": round(stats["total_bytes"] / calls),
+                "max_result_bytes": stats["max_bytes"],
+            }
+        return result
 
     async def web_search(self, query: str) -> Dict[str, Any]:
         """Search the web using a search API.
@@ -61,39 +254,39 @@ class ToolExecutor:
             Dict with results list or error.
         """
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                # Use DuckDuckGo HTML search as a free fallback
-                response = await client.get(
-                    "https://html.duckduckgo.com/html/",
-                    params={"q": query},
-                    headers={"User-Agent": "AgentHub/1.0"},
-                )
-                response.raise_for_status()
-
-                # Extract basic results from HTML
-                results = []
-                # Simple regex extraction from DDG HTML results
-                links = re.findall(
-                    r'<a rel="nofollow" class="result__a" href="([^"]+)"[^>]*>(.+?)</a>',
-                    response.text,
-                )
-                snippets = re.findall(
-                    r'<a class="result__snippet"[^>]*>(.+?)</a>',
-                    response.text,
-                )
+            # Use DuckDuckGo HTML search as a free fallback
+            response = await self.http_cache.get(
+                "https://html.duckduckgo.com/html/",
+                params={"q": query},
+                ttl=HTTP_CACHE_SEARCH_TTL,
+                timeout=15.0,
+            )
+            response.raise_for_status()
+
+            # Extract basic results from HTML
+            results = []
+            # Simple regex extraction from DDG HTML results
+            links = re.findall(
+                r'<a rel="nofollow" class="result__a" href="([^"]+)"[^>]*>(.+?)</a>',
+                response.text,
+            )
+            snippets = re.findall(
+                r'<a class="result__snippet"[^>]*>(.+?)</a>',
+                response.text,
+            )
 
-                for i, (url, title) in enumerate(links[:10]):
-                    snippet = snippets[i] if i < len(snippets) else ""
-                    # Clean HTML tags from snippets
-                    snippet = re.sub(r"<[^>]+>", "", snippet).strip()
-                    title = re.sub(r"<[^>]+>", "", title).strip()
-                    results.append({
-                        "title": title,
-                        "url": url,
-                        "snippet": snippet,
-                    })
+            for i, (url, title) in enumerate(links[:10]):
+                snippet = snippets[i] if i < len(snippets) else ""
+                # Clean HTML tags from snippets
+                snippet = re.sub(r"<[^>]+>", "", snippet).strip()
+                title = re.sub(r"<[^>]+>", "", title).strip()
+                results.append({
+                    "title": title,
+                    "url": url,
+                    "snippet": snippet,
+                })
 
-                return {"query": query, "results": results, "count": len(results)}
+            return {"query": query, "results": results, "count": len(results)}
 
         except httpx.HTTPError as e:
             logger.error("Web search error: %s", e)
@@ -109,30 +302,26 @@ class ToolExecutor:
             Dict with url, title, and text content.
         """
         try:
-            async with httpx.AsyncClient(timeout=20.0, follow_redirects=True) as client:
-                response = await client.get(
-                    url,
-                    headers={"User-Agent": "AgentHub/1.0"},
-                )
-                response.raise_for_status()
+            response = await self.http_cache.get(url, follow_redirects=True, timeout=20.0)
+            response.raise_for_status()
 
-                html = response.text
+            html = response.text
 
-                # Extract title
-                title_match = re.search(r"<title[^>]*>(.*?)</title>", html, re.DOTALL)
-                title = title_match.group(1).strip() if title_match else url
+            # Extract title
+            title_match = re.search(r"<title[^>]*>(.*?)</title>", html, re.DOTALL)
+            title = title_match.group(1).strip() if title_match else url
 
-                # Remove script and style tags
-                text = re.sub(r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL)
-                text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL)
-                # Remove HTML tags
-                text = re.sub(r"<[^>]+>", " ", text)
-                # Clean whitespace
-                text = re.sub(r"\s+", " ", text).strip()
-                # Limit length
-                text = text[:5000]
+            # Remove script and style tags
+            text = re.sub(r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL)
+            text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL)
+            # Remove HTML tags
+            text = re.sub(r"<[^>]+>", " ", text)
+            # Clean whitespace
+            text = re.sub(r"\s+", " ", text).strip()
+            # Limit length
+            text = text[:5000]
 
-                return {"url": url, "title": title, "content": text}
+            return {"url": url, "title": title, "content": text}
 
         except httpx.HTTPError as e:
             logger.error("Web scrape error for %s: %s", url, e)
@@ -141,6 +330,8 @@ class ToolExecutor:
     async def execute_code(self, code: str, language: str = "python") -> Dict[str, Any]:
         """Execute code in a sandboxed subprocess.
 
+        Runs in a warm sandbox worker when one is idle, else in a new interpreter.
+
         Args:
             code: The code to execute.
             language: Programming language (currently only Python supported).
@@ -157,32 +348,31 @@ class ToolExecutor:
             }
 
         try:
-            result = subprocess.run(
-                ["python3", "-c", code],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=ALLOWED_ROOT,
-                env={
-                    "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
-                    "HOME": ALLOWED_ROOT,
-                    "PYTHONDONTWRITEBYTECODE": "1",
-                },
+            result = await self.sandbox.run(
+                code, CODE_TIMEOUT, CODE_STDOUT_LIMIT, CODE_STDERR_LIMIT
             )
-
-            return {
-                "stdout": result.stdout[:10000],
-                "stderr": result.stderr[:5000],
-                "return_code": result.returncode,
+            if result is None:
+                result = await run_process(
+                    ["python3", "-c", code],
+                    timeout=CODE_TIMEOUT,
+                    stdout_limit=CODE_STDOUT_LIMIT,
+                    stderr_limit=CODE_STDERR_LIMIT,
+                    cwd=ALLOWED_ROOT,
+                    env=_sandbox_env(),
+                )
+            output = {
+                "stdout": result["stdout"],
+                "stderr": result["stderr"],
+                "return_code": result["return_code"],
             }
+            if result["truncated"]:
+                output["truncated"] = True
+            if result["timed_out"]:
+                # Output produced before the timeout is still returned
+                output["error"] = f"Code execution timed out ({CODE_TIMEOUT}s limit)"
+                output["return_code"] = -1
+            return output
 
-        except subprocess.TimeoutExpired:
-            return {
-                "error": "Code execution timed out (30s limit)",
-                "stdout": "",
-                "stderr": "",
-                "return_code": -1,
-            }
         except Exception as e:
             logger.exception("Code execution error")
             return {
@@ -266,21 +456,23 @@ class ToolExecutor:
             cmd = ["rg", "--json", "--max-count", "50", "--max-filesize", "1M"]
             if file_type:
                 cmd.extend(["--type", file_type])
-            cmd.extend([pattern, search_path])
+            # "--" keeps a pattern starting with "-" from being read as an option
+            cmd.extend(["--", pattern, search_path])
 
-            result = subprocess.run(
+            result = await run_process(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=15,
+                timeout=SEARCH_TIMEOUT,
+                stdout_limit=SEARCH_OUTPUT_LIMIT,
+                stderr_limit=CODE_STDERR_LIMIT,
             )
+            if result["timed_out"]:
+                return {"pattern": pattern, "matches": [], "error": "Search timed out"}
 
             matches = []
-            for line in result.stdout.strip().split("\n"):
+            for line in result["stdout"].strip().split("\n"):
                 if not line:
                     continue
                 try:
-                    import json
                     data = json.loads(line)
                     if data.get("type") == "match":
                         match_data = data["data"]
@@ -290,6 +482,7 @@ class ToolExecutor:
                             "text": match_data["lines"]["text"].strip(),
                         })
                 except (json.JSONDecodeError, KeyError):
+                    # Includes a line cut off by the output limit
                     continue
 
             return {"pattern": pattern, "matches": matches, "count": len(matches)}
@@ -305,14 +498,19 @@ class ToolExecutor:
                 cmd = ["grep", "-rn", "--max-count=50"]
                 if file_type:
                     cmd.extend(["--include", f"*.{file_type}"])
-                cmd.extend([pattern, search_path])
+                cmd.extend(["--", pattern, search_path])
 
-                result = subprocess.run(
-                    cmd, capture_output=True, text=True, timeout=15
+                result = await run_process(
+                    cmd,
+                    timeout=SEARCH_TIMEOUT,
+                    stdout_limit=SEARCH_OUTPUT_LIMIT,
+                    stderr_limit=CODE_STDERR_LIMIT,
                 )
+                if result["timed_out"]:
+                    return {"pattern": pattern, "matches": [], "error": "Search timed out"}
 
                 matches = []
-                for line in result.stdout.strip().split("\n")[:50]:
+                for line in result["stdout"].strip().split("\n")[:50]:
                     if ":" in line:
                         parts = line.split(":", 2)
                         if len(parts) >= 3:
@@ -326,8 +524,6 @@ class ToolExecutor:
             except Exception as e:
                 return {"pattern": pattern, "matches": [], "error": str(e)}
 
-        except subprocess.TimeoutExpired:
-            return {"pattern": pattern, "matches": [], "error": "Search timed out"}
         except ValueError as e:
             return {"pattern": pattern, "matches": [], "error": str(e)}
 
@@ -0,0 +1,107 @@
+"""WebSocket wire formats.
+
+Clients pick a format when connecting, either by offering a WebSocket
+subprotocol (``agenthub.msgpack`` / ``agenthub.json``) or with a ``?format=``
+query parameter. Plain JSON text frames remain the default.
+
+``json`` frames are the usual ``{"type": ..., "data": ...}`` objects, encoded
+with orjson when it is installed.
+
+``msgpack`` frames are binary MessagePack arrays:
+    - ``[0, task_id, token, seq]`` for agent_response tokens. The agent and
+      conversation of a task are announced once by its agent_thinking event
+      and are not repeated per token.
+    - ``[1, type, data, seq]`` for every other event.
+seq is the broadcast sequence number (None for direct replies).
+"""
+
+import json
+import logging
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary protocol
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+Frame = Union[str, bytes]
+
+SUBPROTOCOL_PREFIX = "agenthub."
+
+FRAME_TOKEN = 0
+FRAME_EVENT = 1
+
+
+class JsonCodec:
+    """JSON text frames (stdlib fallback when orjson is unavailable)."""
+
+    name = "json"
+
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        if orjson is not None:
+            return orjson.dumps(message).decode("utf-8")
+        return json.dumps(message)
+
+    def decode(self, raw: Frame) -> Dict[str, Any]:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+
+class MsgpackCodec:
+    """Compact binary MessagePack frames."""
+
+    name = "msgpack"
+
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        data = message.get("data", {})
+        if message.get("type") == "agent_response":
+            frame = [FRAME_TOKEN, data.get("task_id"), data.get("token", ""), message.get("seq")]
+        else:
+            frame = [FRAME_EVENT, message.get("type", ""), data, message.get("seq")]
+        return msgpack.packb(frame, use_bin_type=True)
+
+    def decode(self, raw: Frame) -> Dict[str, Any]:
+        # Client -> server messages are plain {"type", "data"} maps (or JSON text)
+        if isinstance(raw, str):
+            return json.loads(raw)
+        message = msgpack.unpackb(raw, raw=False)
+        if not isinstance(message, dict):
+            raise ValueError("Expected a map with 'type' and 'data'")
+        return message
+
+
+JSON_CODEC = JsonCodec()
+CODECS: Dict[str, Any] = {"json": JSON_CODEC}
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+
+def negotiate(subprotocols: list, requested_format: Optional[str]) -> tuple:
+    """Pick a codec from offered subprotocols or the ?format= parameter.
+
+    Args:
+        subprotocols: Subprotocols offered by the client, in preference order.
+        requested_format: Value of the ``format`` query parameter, if any.
+
+    Returns:
+        Tuple of (codec, subprotocol to accept or None).
+    """
+    for offered in subprotocols:
+        if offered.startswith(SUBPROTOCOL_PREFIX):
+            codec = CODECS.get(offered[len(SUBPROTOCOL_PREFIX):])
+            if codec is not None:
+                return codec, offered
+    if requested_format:
+        codec = CODECS.get(requested_format)
+        if codec is not None:
+            return codec, None
+        logger.info("Unsupported wire format '%s', falling back to json", requested_format)
+    return JSON_CODEC, None
@@ -0,0 +1,41 @@
+from orchestrator.replay import ReplayBuffer
+
+
+def _record(buffer, *events):
+    for conversation_id, seq in events:
+        buffer.record(conversation_id, {"seq": seq, "conversation_id": conversation_id})
+
+
+def test_since_returns_events_after_last_seq():
+    buffer = ReplayBuffer(size=4, max_conversations=2)
+    _record(buffer, ("A", 1), ("A", 2), ("A", 3))
+    events, gap = buffer.since("A", 1)
+    assert [e["seq"] for e in events] == [2, 3]
+    assert not gap
+
+
+def test_ring_overflow_reports_gap():
+    buffer = ReplayBuffer(size=2, max_conversations=2)
+    _record(buffer, ("A", 1), ("A", 2), ("A", 3))
+    events, gap = buffer.since("A", 0)
+    assert [e["seq"] for e in events] == [2, 3]
+    assert gap
+
+
+def test_evicted_conversation_reports_gap():
+    buffer = ReplayBuffer(size=4, max_conversations=1)
+    _record(buffer, ("A", 1), ("A", 2), ("B", 3))
+    events, gap = buffer.since("A", 1)
+    assert events == []
+    assert gap
+
+
+def test_recreated_conversation_reports_gap():
+    buffer = ReplayBuffer(size=4, max_conversations=1)
+    _record(buffer, ("A", 1), ("A", 2), ("B", 3), ("A", 4))
+    events, gap = buffer.since("A", 1)
+    assert [e["seq"] for e in events] == [4]
+    assert gap
+    # Nothing was lost after seq 2
+    _, gap = buffer.since("A", 3)
+    assert not gap
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+from api import routes
+from db import database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    database.set_db_path(str(tmp_path / "agenthub.db"))
+    asyncio.run(database.init_db())
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _insert(sql, rows):
+    db = await database.get_db()
+    try:
+        await db.executemany(sql, rows)
+        await db.commit()
+    finally:
+        await db.close()
+
+
+async def _conversation(conversation_id):
+    db = await database.get_db()
+    try:
+        return json.loads(await routes._render_conversation(db, conversation_id))
+    finally:
+        await db.close()
+
+
+def test_conversation_messages_in_created_at_order(db_path):
+    _run(_insert("INSERT INTO conversations (id, title) VALUES (?, ?)", [(1, "t")]))
+    # Inserted (and numbered) out of created_at order
+    _run(_insert(
+        "INSERT INTO messages (id, conversation_id, role, content, created_at) VALUES (?, 1, 'user', ?, ?)",
+        [
+            (1, "third", "2024-01-01 00:00:03"),
+            (2, "first", "2024-01-01 00:00:01"),
+            (3, "second-b", "2024-01-01 00:00:02"),
+            (4, "second-a", "2024-01-01 00:00:02"),
+        ],
+    ))
+    conversation = _run(_conversation(1))
+    assert conversation["title"] == "t"
+    assert [m["content"] for m in conversation["messages"]] == ["first", "second-b", "second-a", "third"]
+
+
+def test_conversation_without_messages(db_path):
+    _run(_insert("INSERT INTO conversations (id, title) VALUES (?, ?)", [(1, 't "quoted"')]))
+    conversation = _run(_conversation(1))
+    assert conversation["title"] == 't "quoted"'
+    assert conversation["messages"] == []
+
+
+def test_task_list_newest_first(db_path):
+    _run(_insert(
+        "INSERT INTO tasks (id, description, status, created_at) VALUES (?, ?, ?, ?)",
+        [
+            (1, "middle", "complete", "2024-01-01 00:00:02"),
+            (2, "oldest", "pending", "2024-01-01 00:00:01"),
+            (3, "newest", "complete", "2024-01-01 00:00:03"),
+        ],
+    ))
+    body = json.loads(_run(routes.get_tasks(status=None, limit=50, offset=0)).body)
+    assert [t["description"] for t in body["tasks"]] == ["newest", "middle", "oldest"]
+    assert body["total"] == 3
+
+    body = json.loads(_run(routes.get_tasks(status="complete", limit=1, offset=1)).body)
+    assert [t["description"] for t in body["tasks"]] == ["middle"]
+    assert (body["total"], body["limit"], body["offset"]) == (2, 1, 1)
+
+
+def test_task_detail_subtasks_in_order(db_path):
+    _run(_insert(
+        "INSERT INTO tasks (id, parent_task_id, description, created_at) VALUES (?, ?, ?, ?)",
+        [
+            (1, None, "root", "2024-01-01 00:00:00"),
+            (2, 1, "second", "2024-01-01 00:00:02"),
+            (3, 1, "first", "2024-01-01 00:00:01"),
+        ],
+    ))
+    task = json.loads(_run(routes.get_task(1, wait=0)).body)
+    assert task["description"] == "root"
+    assert [s["description"] for s in task["subtasks"]] == ["first", "second"]
+    assert task["delegations"] == []